@@ -0,0 +1,51 @@
+from concurrent.futures import ThreadPoolExecutor
+
+# Returned by poll() while there is no result to act on yet
+PENDING = object()
+
+
+class AgentWorker:
+    # Runs select_move(board) off the UI thread; one request in flight at a time
+    def __init__(self, select_move, on_cancel=None):
+        self.select_move = select_move
+        # Called when a running request is abandoned, e.g. to end a search early
+        self.on_cancel = on_cancel
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="agent")
+        self._future = None
+        self._key = None
+
+    @staticmethod
+    def _position_key(board):
+        return board.fen(), len(board.move_stack)
+
+    @property
+    def thinking(self):
+        return self._future is not None
+
+    def submit(self, board):
+        self.cancel()
+        self._key = self._position_key(board)
+        self._future = self._executor.submit(self.select_move, board.copy())
+
+    def poll(self, board):
+        # Returns PENDING while thinking, then the result exactly once: the
+        # chosen move, or None if select_move found none. An exception from
+        # select_move is raised here, also once. Results computed for a
+        # different position are dropped and count as PENDING.
+        if self._future is None or not self._future.done():
+            return PENDING
+        future, key = self._future, self._key
+        self._future = self._key = None
+        if key != self._position_key(board):
+            return PENDING
+        return future.result()
+
+    def cancel(self):
+        if self._future is not None:
+            if not self._future.cancel() and self.on_cancel is not None:
+                self.on_cancel()
+        self._future = self._key = None
+
+    def shutdown(self):
+        self.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
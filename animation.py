@@ -0,0 +1,51 @@
+def ease_out(t):
+    return 1 - (1 - t) ** 2
+
+
+class Slide:
+    # One image moving between two screen positions, placed by elapsed time
+    # rather than by frames drawn, so a slow frame never stretches the move
+    __slots__ = ("image", "start", "end", "square", "start_time", "duration")
+
+    def __init__(self, image, start, end, square, start_time, duration):
+        self.image = image
+        self.start = start
+        self.end = end
+        self.square = square  # where the piece lands; hidden on the board meanwhile
+        self.start_time = start_time
+        self.duration = duration
+
+    def progress(self, now):
+        if self.duration <= 0:
+            return 1.0
+        return min(max((now - self.start_time) / self.duration, 0.0), 1.0)
+
+    def position(self, now):
+        t = ease_out(self.progress(now))
+        return (round(self.start[0] + (self.end[0] - self.start[0]) * t),
+                round(self.start[1] + (self.end[1] - self.start[1]) * t))
+
+
+class Animator:
+    # Runs inside the game loop: start() replaces whatever is still moving,
+    # update() returns the (image, position) sprites to draw this frame and
+    # drops the slides that have arrived
+    def __init__(self):
+        self.slides = []
+
+    @property
+    def active(self):
+        return bool(self.slides)
+
+    def start(self, slides):
+        self.slides = list(slides)
+
+    def clear(self):
+        self.slides = []
+
+    def hidden(self):
+        return tuple(slide.square for slide in self.slides)
+
+    def update(self, now):
+        self.slides = [slide for slide in self.slides if slide.progress(now) < 1.0]
+        return [(slide.image, slide.position(now)) for slide in self.slides]
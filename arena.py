@@ -0,0 +1,276 @@
+import argparse
+import csv
+import itertools
+import math
+import multiprocessing as mp
+import os
+import random
+import sys
+import time
+
+import chess
+import chess.pgn
+import numpy as np
+
+import move_encoding
+import obs_encoding
+import policy
+from chess_env import apply_action
+
+RANDOM = "random"
+
+_players = {}
+
+
+def player_name(spec):
+    return RANDOM if spec == RANDOM else os.path.basename(spec)
+
+
+def _init_worker(specs):
+    for spec in specs:
+        _players[spec] = None if spec == RANDOM else policy.load_policy(spec)
+    if "torch" in sys.modules:
+        # Loading a .zip checkpoint brings in torch, which would otherwise
+        # start a thread per core in every worker
+        sys.modules["torch"].set_num_threads(1)
+
+
+class _Game:
+    def __init__(self, game_id, white, black, seed, opening_plies):
+        self.game_id = game_id
+        self.players = {chess.WHITE: white, chess.BLACK: black}
+        self.rng = random.Random(seed)
+        self.board = chess.Board()
+        self.mask = move_encoding.legal_mask(self.board)
+        self.reward = 0
+        self.done = False
+        # Random opening moves, so games between greedy policies differ
+        for _ in range(opening_plies):
+            self.step(self.rng.choice(np.flatnonzero(self.mask)))
+            if self.done:
+                break
+        self.opening = self.board.move_stack[:]
+
+    def step(self, action):
+        self.reward, self.done = apply_action(self.board, action, self.rng, self.mask)
+
+
+def _termination(game, max_plies):
+    if not game.done:
+        return "max plies" if len(game.board.move_stack) >= max_plies else None
+    board = game.board
+    if not game.mask.any():
+        return "checkmate" if board.is_check() else "stalemate"
+    if board.is_insufficient_material():
+        return "insufficient material"
+    if board.is_seventyfive_moves():
+        return "75-move rule"
+    return "fivefold repetition"
+
+
+def _record(game, termination):
+    if termination == "max plies":
+        result = "*"  # unfinished: not a draw, and left out of the scores
+    else:
+        result = {1: "1-0", -1: "0-1"}.get(game.reward, "1/2-1/2")
+    pgn = chess.pgn.Game.from_board(game.board)
+    pgn.headers["Event"] = "Arena"
+    pgn.headers["Round"] = str(game.game_id)
+    pgn.headers["White"] = player_name(game.players[chess.WHITE])
+    pgn.headers["Black"] = player_name(game.players[chess.BLACK])
+    pgn.headers["Result"] = result
+    pgn.headers["Termination"] = termination
+    return {
+        "game": game.game_id,
+        "white": pgn.headers["White"],
+        "black": pgn.headers["Black"],
+        "result": result,
+        "plies": len(game.board.move_stack),
+        "termination": termination,
+        "opening": " ".join(move.uci() for move in game.opening),
+        "pgn": str(pgn),
+    }
+
+
+def play_chunk(tasks, opening_plies=4, max_plies=512):
+    # Plays every game of the chunk concurrently. Each ply, the positions of
+    # all games waiting on the same model are evaluated in one batch.
+    games = [_Game(game_id, white, black, seed, opening_plies) for game_id, white, black, seed in tasks]
+    records = []
+    obs = np.empty((len(games),) + obs_encoding.OBS_SHAPE, dtype=np.float32)
+    while True:
+        # Checked before each ply, since a game can already end in its random opening
+        remaining = []
+        for game in games:
+            termination = _termination(game, max_plies)
+            if termination is None:
+                remaining.append(game)
+            else:
+                records.append(_record(game, termination))
+        games = remaining
+        if not games:
+            break
+        waiting = {}
+        for game in games:
+            waiting.setdefault(game.players[game.board.turn], []).append(game)
+        for spec, group in waiting.items():
+            model = _players[spec]
+            if model is None:
+                for game in group:
+                    game.step(game.rng.choice(np.flatnonzero(game.mask)))
+                continue
+            batch = obs_encoding.encode_boards([game.board for game in group], obs[:len(group)])
+            logits, _ = policy.policy_evaluate(model, batch)
+            for game, row in zip(group, logits):
+                game.step(policy.masked_argmax(row, game.mask))
+    return records
+
+
+def _play_chunk(args):
+    return play_chunk(*args)
+
+
+def play_games(specs, tasks, workers=None, concurrency=64, opening_plies=4, max_plies=512):
+    # Yields the records of each finished chunk of games
+    chunks = [(tasks[i:i + concurrency], opening_plies, max_plies) for i in range(0, len(tasks), concurrency)]
+    with mp.Pool(workers or os.cpu_count(), initializer=_init_worker, initargs=(specs,)) as pool:
+        yield from pool.imap_unordered(_play_chunk, chunks)
+
+
+def schedule(specs, games_per_pair, seed=0):
+    # Every pair plays games_per_pair games; consecutive games share an
+    # opening seed with colours swapped
+    tasks = []
+    rng = random.Random(seed)
+    for a, b in itertools.combinations(specs, 2):
+        for i in range(0, games_per_pair, 2):
+            game_seed = rng.getrandbits(32)
+            tasks.append((len(tasks), a, b, game_seed))
+            if i + 1 < games_per_pair:
+                tasks.append((len(tasks), b, a, game_seed))
+    return tasks
+
+
+def elo_from_score(score):
+    score = min(max(score, 1e-3), 1 - 1e-3)
+    return -400 * math.log10(1 / score - 1)
+
+
+def pair_stats(records, a, b):
+    # Score of a against b with a 95% interval from the per-game variance
+    scores = []
+    for r in records:
+        if {r["white"], r["black"]} != {a, b} or r["result"] == "*":
+            continue
+        white_score = {"1-0": 1.0, "0-1": 0.0}.get(r["result"], 0.5)
+        scores.append(white_score if r["white"] == a else 1 - white_score)
+    if not scores:
+        return None
+    scores = np.array(scores)
+    mean = scores.mean()
+    margin = 1.96 * scores.std() / math.sqrt(len(scores))
+    return len(scores), mean, elo_from_score(mean), elo_from_score(mean - margin), elo_from_score(mean + margin)
+
+
+def ratings(records, names, anchor=RANDOM, iterations=50):
+    # Maximum-likelihood Elo over all games (draws count half), with one
+    # virtual draw per pair to keep perfect scores finite. Intervals come
+    # from the inverse Fisher information, relative to the anchor.
+    index = {name: i for i, name in enumerate(names)}
+    n = len(names)
+    games = np.zeros((n, n))
+    wins = np.zeros((n, n))
+    for i, j in itertools.combinations(range(n), 2):
+        games[i, j] = games[j, i] = 1
+        wins[i, j] = wins[j, i] = 0.5
+    for r in records:
+        if r["result"] == "*":
+            continue
+        w, b = index[r["white"]], index[r["black"]]
+        white_score = {"1-0": 1.0, "0-1": 0.0}.get(r["result"], 0.5)
+        games[w, b] += 1
+        games[b, w] += 1
+        wins[w, b] += white_score
+        wins[b, w] += 1 - white_score
+    k = math.log(10) / 400
+    fixed = index.get(anchor, 0)
+    free = [i for i in range(n) if i != fixed]
+    rating = np.zeros(n)
+    for _ in range(iterations):
+        p = 1 / (1 + np.exp(-k * (rating[:, None] - rating[None, :])))
+        gradient = k * (wins - games * p).sum(axis=1)
+        weight = k * k * games * p * (1 - p)
+        hessian = np.diag(weight.sum(axis=1)) - weight
+        step = np.linalg.solve(hessian[np.ix_(free, free)], gradient[free])
+        rating[free] += step
+        if np.abs(step).max() < 1e-6:
+            break
+    errors = np.zeros(n)
+    errors[free] = np.sqrt(np.diag(np.linalg.inv(hessian[np.ix_(free, free)])))
+    return {name: (rating[i], 1.96 * errors[i]) for name, i in index.items()}
+
+
+CSV_FIELDS = ["game", "white", "black", "result", "plies", "termination", "opening"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play checkpoints against each other and rate them")
+    parser.add_argument("players", nargs="*",
+                        help=f"checkpoint paths without extension, or '{RANDOM}' (default: chess_agent/ppo_* and random)")
+    parser.add_argument("--games", type=int, default=200, help="games per pair")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--concurrency", type=int, default=64, help="games played at once per worker")
+    parser.add_argument("--opening-plies", type=int, default=4)
+    parser.add_argument("--max-plies", type=int, default=512)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--pgn", help="write games to this PGN file")
+    parser.add_argument("--csv", help="write one row per game to this CSV file")
+    args = parser.parse_args()
+
+    specs = args.players or [RANDOM] + [
+        f"chess_agent/ppo_{d}" for d in ["easy", "medium", "hard", "pro"]
+        if os.path.exists(f"chess_agent/ppo_{d}.npz") or os.path.exists(f"chess_agent/ppo_{d}.zip")
+    ]
+    names = [player_name(spec) for spec in specs]
+    if len(set(names)) != len(names) or len(names) < 2:
+        parser.error("need at least two players with distinct names")
+
+    tasks = schedule(specs, args.games, args.seed)
+    pgn_file = open(args.pgn, "w") if args.pgn else None
+    csv_file = open(args.csv, "w", newline="") if args.csv else None
+    writer = csv.DictWriter(csv_file, CSV_FIELDS, extrasaction="ignore") if csv_file else None
+    if writer:
+        writer.writeheader()
+
+    records = []
+    start = time.perf_counter()
+    for chunk in play_games(specs, tasks, args.workers, args.concurrency, args.opening_plies, args.max_plies):
+        for record in chunk:
+            pgn = record.pop("pgn")
+            if pgn_file:
+                pgn_file.write(pgn + "\n\n")
+            if writer:
+                writer.writerow(record)
+        records.extend(chunk)
+        elapsed = time.perf_counter() - start
+        plies = sum(r["plies"] for r in records)
+        print(f"\r{len(records)}/{len(tasks)} games, {len(records) / elapsed:.1f} games/s, "
+              f"{plies / elapsed:.0f} plies/s", end="", flush=True)
+    print()
+    for f in (pgn_file, csv_file):
+        if f:
+            f.close()
+
+    print("\nPairwise: games, score of the first player, Elo difference [95% CI]")
+    for a, b in itertools.combinations(names, 2):
+        stats = pair_stats(records, a, b)
+        if stats:
+            n, score, elo, low, high = stats
+            print(f"  {a} vs {b}: {n} games, {score:.3f}, {elo:+.0f} [{low:+.0f}, {high:+.0f}]")
+    unfinished = sum(r["result"] == "*" for r in records)
+    if unfinished:
+        print(f"\n{unfinished} games reached --max-plies; they are recorded as '*' and left out of the scores")
+    anchor = RANDOM if RANDOM in names else names[0]
+    print(f"\nRatings (Elo relative to {anchor}, 95% CI)")
+    for name, (rating, margin) in sorted(ratings(records, names, anchor).items(), key=lambda item: -item[1][0]):
+        print(f"  {name:<16} {rating:+7.0f} ± {margin:.0f}")
@@ -0,0 +1,65 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+def file_stamp(paths):
+    stamp = []
+    for path in paths:
+        try:
+            stamp.append(os.path.getmtime(path))
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+
+class AssetCache:
+    # Process-wide cache of loaded assets. Entries are keyed by identity and
+    # reloaded when the mtime of any backing file changes.
+    def __init__(self):
+        self._entries = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self.hits = 0
+        self.misses = 0
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def get(self, key, loader, paths=()):
+        # Concurrent requests for one key (e.g. a preload and the game)
+        # share a single load
+        with self._key_lock(key):
+            stamp = file_stamp(paths)
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            value = loader()
+            self._entries[key] = (stamp, value)
+            return value
+
+    def preload(self, getter, *args):
+        # Run a cached getter on a background thread so the entry is warm
+        # by the time it is needed
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="preload")
+        return self._executor.submit(self._preload, getter, args)
+
+    @staticmethod
+    def _preload(getter, args):
+        try:
+            getter(*args)
+        except Exception:
+            # Failures surface again when the game asks for the asset
+            pass
+
+    def discard(self, key):
+        with self._key_lock(key):
+            self._entries.pop(key, None)
+
+
+assets = AssetCache()
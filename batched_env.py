@@ -0,0 +1,269 @@
+import multiprocessing as mp
+import random
+from multiprocessing import shared_memory
+
+import chess
+import numpy as np
+from gymnasium import spaces
+from stable_baselines3.common.vec_env.base_vec_env import VecEnv
+
+import move_encoding
+from chess_env import apply_action, encode_observations, observation_space
+
+# Action that leaves a board untouched for one step, e.g. while an opponent
+# moves on the other boards (see train.py)
+PASS = -1
+
+
+class _BoardEnv:
+    # What get_attr/set_attr/env_method see as one sub-env: a board of the
+    # shard with its rng and legal mask. Other attributes can be set freely.
+    render_mode = None
+    spec = None
+
+    def __init__(self, shard, index):
+        self._shard = shard
+        self._index = index
+
+    @property
+    def board(self):
+        return self._shard.boards[self._index]
+
+    @property
+    def rng(self):
+        return self._shard.rngs[self._index]
+
+    @property
+    def obs_mode(self):
+        return self._shard.obs_mode
+
+    @property
+    def observation_space(self):
+        return self._shard.observation_space
+
+    @property
+    def action_space(self):
+        return self._shard.action_space
+
+    def action_masks(self):
+        return self._shard.masks[self._index].copy()
+
+
+class _BoardShard:
+    # Steps a contiguous slice of boards and writes into the caller's arrays
+    def __init__(self, obs, rewards, dones, masks, obs_mode):
+        n = len(obs)
+        self.obs = obs
+        self.obs_mode = obs_mode
+        self.observation_space = observation_space(obs_mode)
+        self.action_space = spaces.Discrete(move_encoding.ACTION_SIZE)
+        self.rewards = rewards
+        self.dones = dones
+        self.masks = masks
+        self.boards = [chess.Board() for _ in range(n)]
+        self.rngs = [random.Random() for _ in range(n)]
+        self.envs = [_BoardEnv(self, i) for i in range(n)]
+
+    def reset(self, seeds):
+        for board, rng, seed, mask in zip(self.boards, self.rngs, seeds, self.masks):
+            if seed is not None:
+                rng.seed(seed)
+            board.reset()
+            move_encoding.legal_mask(board, mask)
+        encode_observations(self.boards, self.obs_mode, self.obs)
+
+    def step(self, actions):
+        infos = [{} for _ in self.boards]
+        for i, (board, rng, action) in enumerate(zip(self.boards, self.rngs, actions)):
+            if action == PASS:
+                self.rewards[i] = 0
+                self.dones[i] = False
+                continue
+            reward, done = apply_action(board, action, rng, self.masks[i])
+            self.rewards[i] = reward
+            self.dones[i] = done
+            if done:
+                infos[i]["terminal_observation"] = encode_observations([board], self.obs_mode)[0]
+                infos[i]["TimeLimit.truncated"] = False
+                board.reset()
+                move_encoding.legal_mask(board, self.masks[i])
+        encode_observations(self.boards, self.obs_mode, self.obs)
+        return infos
+
+    # VecEnv per-env access, with indices local to the shard
+    def get_attr(self, attr_name, indices):
+        return [getattr(self.envs[i], attr_name) for i in indices]
+
+    def set_attr(self, attr_name, value, indices):
+        for i in indices:
+            setattr(self.envs[i], attr_name, value)
+
+    def env_method(self, method_name, args, kwargs, indices):
+        return [getattr(self.envs[i], method_name)(*args, **kwargs) for i in indices]
+
+
+def _attach(name, shape, dtype):
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+def _worker(remote, parent_remote, layout, start, stop, obs_mode):
+    parent_remote.close()
+    handles = []
+    arrays = {}
+    for key, (name, shape, dtype) in layout.items():
+        shm, array = _attach(name, shape, dtype)
+        handles.append(shm)
+        arrays[key] = array[start:stop]
+    shard = _BoardShard(arrays["obs"], arrays["rewards"], arrays["dones"], arrays["masks"], obs_mode)
+    try:
+        while True:
+            cmd, data = remote.recv()
+            if cmd == "step":
+                remote.send(shard.step(arrays["actions"]))
+            elif cmd == "reset":
+                shard.reset(data)
+                remote.send(None)
+            elif cmd in ("get_attr", "set_attr", "env_method"):
+                try:
+                    remote.send((True, getattr(shard, cmd)(*data)))
+                except Exception as exc:
+                    remote.send((False, exc))
+            elif cmd == "close":
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        del arrays, shard
+        for shm in handles:
+            shm.close()
+        remote.close()
+
+
+class BatchedChessEnv(VecEnv):
+    render_mode = None
+
+    def __init__(self, num_envs, n_workers=0, start_method=None, obs_mode="float32"):
+        obs_space = observation_space(obs_mode)
+        self.obs_mode = obs_mode
+        action_space = spaces.Discrete(move_encoding.ACTION_SIZE)
+        self.n_workers = min(n_workers, num_envs)
+        self._shms = []
+        self._layout = {}
+        specs = {
+            "obs": ((num_envs,) + obs_space.shape, obs_space.dtype),
+            "rewards": ((num_envs,), np.float32),
+            "dones": ((num_envs,), np.bool_),
+            "actions": ((num_envs,), np.int64),
+            "masks": ((num_envs, move_encoding.ACTION_SIZE), np.bool_),
+        }
+        for key, (shape, dtype) in specs.items():
+            if self.n_workers:
+                size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+                shm = shared_memory.SharedMemory(create=True, size=size)
+                self._shms.append(shm)
+                self._layout[key] = (shm.name, shape, dtype)
+                array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+            else:
+                array = np.zeros(shape, dtype=dtype)
+            setattr(self, f"buf_{key}", array)
+
+        if self.n_workers:
+            bounds = np.linspace(0, num_envs, self.n_workers + 1).astype(int)
+            self._slices = list(zip(bounds[:-1], bounds[1:]))
+            ctx = mp.get_context(start_method)
+            self.remotes, self.processes = [], []
+            for start, stop in self._slices:
+                remote, work_remote = ctx.Pipe()
+                process = ctx.Process(
+                    target=_worker, args=(work_remote, remote, self._layout, start, stop, obs_mode), daemon=True
+                )
+                process.start()
+                work_remote.close()
+                self.remotes.append(remote)
+                self.processes.append(process)
+        else:
+            self.shard = _BoardShard(self.buf_obs, self.buf_rewards, self.buf_dones, self.buf_masks, obs_mode)
+
+        self.closed = False
+        super().__init__(num_envs, obs_space, action_space)
+
+    def reset(self):
+        if self.n_workers:
+            for remote, (start, stop) in zip(self.remotes, self._slices):
+                remote.send(("reset", self._seeds[start:stop]))
+            for remote in self.remotes:
+                remote.recv()
+        else:
+            self.shard.reset(self._seeds)
+        self._reset_seeds()
+        self._reset_options()
+        return self.buf_obs.copy()
+
+    def step_async(self, actions):
+        self.buf_actions[:] = np.asarray(actions).reshape(self.num_envs)
+        if self.n_workers:
+            for remote in self.remotes:
+                remote.send(("step", None))
+
+    def step_wait(self):
+        if self.n_workers:
+            infos = []
+            for remote in self.remotes:
+                infos.extend(remote.recv())
+        else:
+            infos = self.shard.step(self.buf_actions)
+        return self.buf_obs.copy(), self.buf_rewards.copy(), self.buf_dones.copy(), infos
+
+    def close(self):
+        if self.closed:
+            return
+        if self.n_workers:
+            for remote in self.remotes:
+                remote.send(("close", None))
+            for process in self.processes:
+                process.join()
+            for shm in self._shms:
+                shm.close()
+                shm.unlink()
+        self.closed = True
+
+    def action_masks(self):
+        return self.buf_masks.copy()
+
+    def _dispatch(self, cmd, indices, *args):
+        # Runs a per-env command on the shards holding indices and returns
+        # the results in the order of indices. Boards living in worker
+        # processes come back as copies.
+        indices = list(self._get_indices(indices))
+        if not self.n_workers:
+            return getattr(self.shard, cmd)(*args, indices)
+        results, error = {}, None
+        for remote, (start, stop) in zip(self.remotes, self._slices):
+            local = [i - start for i in indices if start <= i < stop]
+            if not local:
+                continue
+            remote.send((cmd, args + (local,)))
+            ok, value = remote.recv()
+            if not ok:
+                error = error or value
+            elif value is not None:
+                results.update(zip([start + i for i in local], value))
+        if error is not None:
+            raise error
+        return [results.get(i) for i in indices]
+
+    def get_boards(self, indices=None):
+        return self._dispatch("get_attr", indices, "board")
+
+    def get_attr(self, attr_name, indices=None):
+        return self._dispatch("get_attr", indices, attr_name)
+
+    def set_attr(self, attr_name, value, indices=None):
+        self._dispatch("set_attr", indices, attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        return self._dispatch("env_method", indices, method_name, method_args, method_kwargs)
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False for _ in self._get_indices(indices)]
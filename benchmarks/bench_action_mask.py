@@ -0,0 +1,64 @@
+import os
+import random
+import sys
+
+import chess
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import move_encoding
+from chess_env import ChessEnv
+
+counters = {"calls": 0, "moves": 0}
+_generate_legal_moves = chess.Board.generate_legal_moves
+
+
+def counting_generate_legal_moves(self, *args, **kwargs):
+    counters["calls"] += 1
+    for move in _generate_legal_moves(self, *args, **kwargs):
+        counters["moves"] += 1
+        yield move
+
+
+# ChessEnv.step as it was before the cached action mask
+def legacy_step(board, action):
+    move = move_encoding.decode(action, board)
+    fallback = move not in board.legal_moves
+    if fallback:
+        move = random.choice(list(board.legal_moves))
+    board.push(move)
+    if board.is_game_over():
+        board.result()
+        board.reset()
+    return fallback
+
+
+def run(step, plies, seed=0):
+    rng = np.random.default_rng(seed)
+    random.seed(seed)
+    counters.update(calls=0, moves=0)
+    fallbacks = sum(step(rng.standard_normal(move_encoding.ACTION_SIZE)) for _ in range(plies))
+    return counters["calls"] / plies, counters["moves"] / plies, fallbacks / plies
+
+
+if __name__ == "__main__":
+    chess.Board.generate_legal_moves = counting_generate_legal_moves
+    plies = 5000
+    board = chess.Board()
+    env = ChessEnv()
+    env.reset()
+
+    def legacy(logits):
+        return legacy_step(board, int(np.argmax(logits)))
+
+    def masked(logits):
+        action = int(np.argmax(np.where(env.action_masks(), logits, -np.inf)))
+        if env.step(action)[2]:
+            env.reset()
+        return False
+
+    for name, step in [("legacy", legacy), ("masked", masked)]:
+        calls, moves, fallbacks = run(step, plies)
+        print(f"{name} step: {calls:5.2f} legal-move generator calls/ply, "
+              f"{moves:6.1f} moves generated/ply, {fallbacks:6.1%} random fallbacks")
@@ -0,0 +1,68 @@
+import argparse
+import os
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chess
+import numpy as np
+import pygame
+
+import mainGui
+from agent_worker import PENDING, AgentWorker
+
+
+def make_select(think_ms):
+    def select(board):
+        # Stand-in for a slow policy: blocks like a native forward pass would
+        time.sleep(think_ms / 1000)
+        return next(iter(board.legal_moves))
+    return select
+
+
+def run(mode, think_ms, frames):
+    screen = pygame.display.set_mode((mainGui.WIDTH + mainGui.PANEL_WIDTH, mainGui.HEIGHT))
+    images = mainGui.load_piece_images("classic")
+    board = chess.Board()
+    clock = pygame.time.Clock()
+    select = make_select(think_ms)
+    agent = AgentWorker(select)
+    times = []
+    last = time.perf_counter()
+    for _ in range(frames):
+        draw_surface = screen.subsurface((0, 0, mainGui.WIDTH, mainGui.HEIGHT))
+        mainGui.draw_board(draw_surface, board, images)
+        pygame.display.flip()
+        clock.tick(mainGui.FPS)
+        pygame.event.pump()
+        if mode == "sync":
+            move = select(board)
+        else:
+            if not agent.thinking:
+                agent.submit(board)
+            move = agent.poll(board)
+        if move is not None and move is not PENDING:
+            board.push(move)
+            if board.is_game_over():
+                board.reset()
+        now = time.perf_counter()
+        times.append((now - last) * 1000)
+        last = now
+    agent.shutdown()
+    return np.array(times[1:])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--think-ms", type=float, default=250)
+    parser.add_argument("--frames", type=int, default=150)
+    args = parser.parse_args()
+    budget = 1000 / mainGui.FPS
+    for mode in ("sync", "worker"):
+        times = run(mode, args.think_ms, args.frames)
+        dropped = int(np.sum(times > budget * 1.5))
+        print(f"{mode:>6}: p50 {np.median(times):6.1f} ms  p99 {np.percentile(times, 99):6.1f} ms  "
+              f"max {times.max():6.1f} ms  dropped {dropped}/{len(times)} frames")
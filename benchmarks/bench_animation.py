@@ -0,0 +1,70 @@
+import os
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chess
+import pygame
+
+import mainGui
+from animation import Animator
+
+MOVE = chess.Move.from_uci("g1f3")
+
+
+def legacy(screen, images):
+    # The old animate_piece_move: a blocking 10-frame loop that redrew the
+    # whole board each frame, with no event handling until it returned
+    board = chess.Board()
+    clock = pygame.time.Clock()
+    piece_image = images["wn"]
+    start = time.perf_counter()
+    work = 0.0
+    for i in range(1, 11):
+        frame_start = time.perf_counter()
+        screen.fill((30, 30, 30))
+        board_surface = screen.subsurface((0, 0, mainGui.WIDTH, mainGui.HEIGHT))
+        mainGui.draw_board(board_surface, board, images, skip_square=MOVE.from_square)
+        board_surface.blit(piece_image, ((6 - i / 10) * mainGui.SQUARE_SIZE, (7 - 2 * i / 10) * mainGui.SQUARE_SIZE))
+        pygame.display.flip()
+        work += time.perf_counter() - frame_start
+        clock.tick(mainGui.FPS)
+    return work / 10, time.perf_counter() - start
+
+
+def scheduled(screen, images):
+    # The game loop with the animator: one frame per loop iteration, events
+    # polled in between, only the sprite's squares redrawn
+    board = chess.Board()
+    renderer = mainGui.BoardRenderer(screen, images)
+    renderer.draw(board)
+    renderer.take_dirty()
+    animator = Animator()
+    clock = pygame.time.Clock()
+    animator.start(mainGui.move_slides(board, MOVE, images, pygame.time.get_ticks()))
+    board.push(MOVE)
+    frames, work, longest_block = 0, 0.0, 0.0
+    while animator.active:
+        frame_start = time.perf_counter()
+        sprites = animator.update(pygame.time.get_ticks())
+        renderer.draw(board, None, [], MOVE, animator.hidden(), sprites)
+        pygame.display.update(renderer.take_dirty())
+        pygame.event.pump()
+        elapsed = time.perf_counter() - frame_start
+        work += elapsed
+        longest_block = max(longest_block, elapsed)
+        frames += 1
+        clock.tick(mainGui.FPS)
+    return work / frames, longest_block
+
+
+if __name__ == "__main__":
+    screen = pygame.display.set_mode((mainGui.WIDTH + mainGui.PANEL_WIDTH, mainGui.HEIGHT))
+    images = mainGui.load_piece_images("classic")
+    frame, blocked = legacy(screen, images)
+    print(f"nested loop: {frame * 1e3:6.2f} ms work/frame, input blocked {blocked * 1e3:6.1f} ms per move")
+    frame, blocked = scheduled(screen, images)
+    print(f"animator:    {frame * 1e3:6.2f} ms work/frame, input blocked {blocked * 1e3:6.1f} ms at most")
@@ -0,0 +1,42 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batched_env import BatchedChessEnv
+from chess_env import ChessEnv
+
+
+def steps_per_sec(env, steps, seed=0):
+    rng = np.random.default_rng(seed)
+    env.reset()
+    actions = rng.integers(0, env.action_space.n, size=(steps, env.num_envs))
+    start = time.perf_counter()
+    for a in actions:
+        env.step(a)
+    return steps * env.num_envs / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num-envs", type=int, default=64)
+    parser.add_argument("--steps", type=int, default=200)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    from stable_baselines3.common.vec_env import DummyVecEnv
+    dummy = DummyVecEnv([ChessEnv for _ in range(args.num_envs)])
+    print(f"DummyVecEnv x{args.num_envs}:        {steps_per_sec(dummy, args.steps):10.0f} env-steps/s")
+    dummy.close()
+
+    workers = 0
+    while workers <= args.max_workers:
+        env = BatchedChessEnv(args.num_envs, n_workers=workers)
+        label = "in-process" if workers == 0 else f"{workers} workers"
+        print(f"BatchedChessEnv {label:>10}: {steps_per_sec(env, args.steps):10.0f} env-steps/s")
+        env.close()
+        workers = 1 if workers == 0 else workers * 2
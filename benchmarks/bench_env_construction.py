@@ -0,0 +1,45 @@
+import os
+import sys
+import time
+
+import chess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chess_env import ChessEnv
+import move_encoding
+
+
+# The move table ChessEnv used to build on every construction
+def legacy_generate_all_moves():
+    moves = []
+    for from_square in chess.SQUARES:
+        for to_square in chess.SQUARES:
+            for promo in [None, chess.QUEEN, chess.ROOK, chess.BISHOP, chess.KNIGHT]:
+                try:
+                    move = chess.Move(from_square, to_square, promotion=promo)
+                    chess.Board().push(move)
+                    moves.append(move)
+                except:
+                    continue
+    return moves
+
+
+def timeit(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+if __name__ == "__main__":
+    legacy = timeit(legacy_generate_all_moves, 1)
+    table = timeit(move_encoding._build_tables, 5)
+    env = timeit(ChessEnv, 100)
+    board = chess.Board()
+    moves = list(board.legal_moves)
+    codec = timeit(lambda: [move_encoding.decode(move_encoding.encode(m), board) for m in moves], 1000) / len(moves)
+    print(f"legacy move scan:      {legacy * 1000:10.2f} ms")
+    print(f"move table build:      {table * 1000:10.2f} ms (once per process)")
+    print(f"ChessEnv() construct:  {env * 1000:10.3f} ms")
+    print(f"encode+decode:         {codec * 1e6:10.3f} us/move")
@@ -0,0 +1,51 @@
+import os
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import pygame
+
+import mainGui
+
+_update = pygame.display.update
+_get = pygame.event.get
+first_frame = {}
+
+
+def timed_update(*args, **kwargs):
+    first_frame.setdefault("t", time.perf_counter())
+    return _update(*args, **kwargs)
+
+
+def click_menu(*args, **kwargs):
+    # Leave the game as soon as the first frame has been shown
+    _get()
+    pos = (mainGui.WIDTH + mainGui.PANEL_WIDTH // 2, 50)
+    return [pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=pos, button=1)]
+
+
+def time_to_first_frame(difficulty, theme):
+    first_frame.clear()
+    start = time.perf_counter()
+    mainGui.run_game(difficulty, theme, "white")
+    return (first_frame["t"] - start) * 1000
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    difficulty = args[0] if args else "easy"
+    if "--preload" in sys.argv:
+        # What the main menu does while the player is choosing
+        for future in mainGui.preload_assets():
+            future.result()
+    pygame.display.update = timed_update
+    pygame.event.get = click_menu
+    for game in (1, 2, 3):
+        ms = time_to_first_frame(difficulty, "classic")
+        print(f"game {game}: {ms:8.1f} ms from run_game() to first board frame "
+              f"(cache hits {mainGui.assets.hits}, misses {mainGui.assets.misses})")
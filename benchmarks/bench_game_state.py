@@ -0,0 +1,66 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chess
+import numpy as np
+
+from game_state import GameState
+
+FRAMES_PER_PLY = 30
+
+
+def sample_game(plies=80, seed=0):
+    rng = np.random.default_rng(seed)
+    board = chess.Board()
+    while len(board.move_stack) < plies and not board.is_game_over():
+        moves = list(board.legal_moves)
+        board.push(moves[rng.integers(len(moves))])
+    return board.move_stack
+
+
+def legacy(moves):
+    # What run_game did: two is_game_over() per frame, SAN before each push
+    # and list slicing on Undo
+    board, history = chess.Board(), []
+    for move in moves:
+        for _ in range(FRAMES_PER_PLY):
+            board.is_game_over()
+            board.is_game_over()
+        history.append(board.san(move))
+        board.push(move)
+    for _ in range(len(moves) // 2):
+        board.pop()
+        board.pop()
+        history = history[:-2]
+        for _ in range(FRAMES_PER_PLY):
+            board.is_game_over()
+            board.is_game_over()
+
+
+def tracked(moves):
+    state = GameState()
+    for move in moves:
+        for _ in range(FRAMES_PER_PLY):
+            state.is_game_over()
+            state.is_game_over()
+        state.push(move)
+    for _ in range(len(moves) // 2):
+        state.pop()
+        state.pop()
+        state.san_history()
+        for _ in range(FRAMES_PER_PLY):
+            state.is_game_over()
+            state.is_game_over()
+
+
+if __name__ == "__main__":
+    moves = sample_game()
+    for name, fn in [("legacy board calls", legacy), ("GameState", tracked)]:
+        start = time.perf_counter()
+        fn(moves)
+        elapsed = time.perf_counter() - start
+        frames = 2 * len(moves) * FRAMES_PER_PLY
+        print(f"{name:<20} {elapsed / frames * 1e6:8.2f} us/frame over {len(moves)} plies plus undo")
@@ -0,0 +1,75 @@
+import argparse
+import multiprocessing as mp
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import chess
+import numpy as np
+
+import policy
+from inference_client import RemotePolicy
+from inference_server import format_stats
+from profiler import _rss_mb
+from search import PolicySearch
+
+
+def sample_boards(n, seed):
+    rng = np.random.default_rng(seed)
+    board, boards = chess.Board(), []
+    while len(boards) < n:
+        if board.is_game_over():
+            board.reset()
+        moves = list(board.legal_moves)
+        board.push(moves[rng.integers(len(moves))])
+        boards.append(board.copy())
+    return boards
+
+
+def client(args):
+    # One player: a few searched moves, as the GUI plays Medium
+    model_path, server, moves, nodes, seed = args
+    model = policy.load_policy(model_path, server=server)
+    start = time.perf_counter()
+    search = PolicySearch(model, nodes=nodes)
+    for board in sample_boards(moves, seed):
+        search.search(board)
+    return time.perf_counter() - start, _rss_mb()
+
+
+def run(clients, model_path, server, moves, nodes):
+    with mp.Pool(clients) as pool:
+        start = time.perf_counter()
+        results = pool.map(client, [(model_path, server, moves, nodes, seed) for seed in range(clients)])
+        elapsed = time.perf_counter() - start
+    return clients * moves / elapsed, max(rss for _, rss in results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default="chess_agent/ppo_hard")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--moves", type=int, default=10)
+    parser.add_argument("--nodes", type=int, default=96)
+    parser.add_argument("--window-ms", type=float, default=2.0)
+    args = parser.parse_args()
+    model_path = os.path.join(ROOT, args.model)
+    address = os.path.join(tempfile.mkdtemp(), "bench.sock")
+    server = subprocess.Popen([sys.executable, os.path.join(ROOT, "inference_server.py"), "serve", model_path,
+                               "--address", address, "--window-ms", str(args.window_ms)])
+    try:
+        while not os.path.exists(address):
+            time.sleep(0.05)
+        for clients in args.clients:
+            for label, target in [("local models", None), ("shared server", address)]:
+                rate, rss = run(clients, model_path, target, args.moves, args.nodes)
+                print(f"{clients:>2} clients, {label:<13} {rate:8.1f} moves/s, peak client RSS {rss:6.0f} MB")
+        print(format_stats(RemotePolicy(address, "").stats()))
+    finally:
+        server.terminate()
+        server.wait()
@@ -0,0 +1,72 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chess
+import numpy as np
+
+import move_encoding
+import obs_encoding
+import policy
+from numpy_policy import NumpyPolicy
+
+
+def per_move(fn, boards, repeat=3):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for board in boards:
+            fn(board)
+    return (time.perf_counter() - start) / (repeat * len(boards)) * 1e6
+
+
+def sample_boards(n, seed=0):
+    rng = np.random.default_rng(seed)
+    board, boards = chess.Board(), []
+    while len(boards) < n:
+        if board.is_game_over():
+            board.reset()
+        moves = list(board.legal_moves)
+        board.push(moves[rng.integers(len(moves))])
+        boards.append(board.copy(stack=False))
+    return boards
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("model", nargs="?", help="PPO checkpoint (default: a freshly initialised MlpPolicy)")
+    parser.add_argument("--positions", type=int, default=300)
+    args = parser.parse_args()
+
+    import torch
+    from stable_baselines3 import PPO
+    from chess_env import ChessEnv
+    from export_policy import export
+
+    torch.set_num_threads(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.model
+        if path is None:
+            path = os.path.join(tmp, "ppo_bench")
+            PPO("MlpPolicy", ChessEnv(), device="cpu").save(path)
+        model, npz_path = export(path, os.path.join(tmp, "bench.npz"))
+        numpy_policy = NumpyPolicy.load(npz_path)
+
+    boards = sample_boards(args.positions)
+    observer = obs_encoding.BoardObserver()
+
+    def sb3_predict(board):
+        model.predict(observer.observe(board), deterministic=True)
+
+    def sb3_masked(board):
+        policy.masked_predict(model, observer.observe(board), move_encoding.legal_mask(board))
+
+    def numpy_masked(board):
+        policy.masked_predict(numpy_policy, observer.observe(board), move_encoding.legal_mask(board))
+
+    for name, fn in [("SB3 model.predict", sb3_predict), ("SB3 masked predict", sb3_masked),
+                     ("NumPy masked predict", numpy_masked)]:
+        print(f"{name:<22} {per_move(fn, boards):8.1f} us/move")
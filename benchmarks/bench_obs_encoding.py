@@ -0,0 +1,73 @@
+import os
+import random
+import sys
+import time
+
+import chess
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import obs_encoding
+
+
+# The per-square loop ChessEnv._get_obs used before the bitboard encoder
+def legacy_get_obs(board):
+    mapping = {
+        chess.PAWN: 0, chess.KNIGHT: 1, chess.BISHOP: 2,
+        chess.ROOK: 3, chess.QUEEN: 4, chess.KING: 5
+    }
+    obs = np.zeros((8, 8, 12), dtype=np.float32)
+    for sq in chess.SQUARES:
+        piece = board.piece_at(sq)
+        if piece:
+            idx = mapping[piece.piece_type] + (0 if piece.color == chess.WHITE else 6)
+            obs[sq // 8, sq % 8, idx] = 1
+    return obs
+
+
+def random_positions(n, seed=0):
+    rng = random.Random(seed)
+    boards = []
+    board = chess.Board()
+    while len(boards) < n:
+        if board.is_game_over():
+            board.reset()
+        board.push(rng.choice(list(board.legal_moves)))
+        boards.append(board.copy(stack=False))
+    return boards
+
+
+def per_call(fn, items, repeat=5):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for item in items:
+            fn(item)
+    return (time.perf_counter() - start) / (repeat * len(items))
+
+
+if __name__ == "__main__":
+    boards = random_positions(2000)
+    buf = np.empty(obs_encoding.OBS_SHAPE, dtype=np.float32)
+    for b in boards:
+        assert np.array_equal(legacy_get_obs(b), obs_encoding.encode_board(b, buf))
+
+    legacy = per_call(legacy_get_obs, boards)
+    fresh = per_call(obs_encoding.encode_board, boards)
+    reuse = per_call(lambda b: obs_encoding.encode_board(b, buf), boards)
+    batch_buf = np.empty((len(boards),) + obs_encoding.OBS_SHAPE, dtype=np.float32)
+    start = time.perf_counter()
+    for _ in range(5):
+        obs_encoding.encode_boards(boards, batch_buf)
+    batched = (time.perf_counter() - start) / (5 * len(boards))
+
+    observer = obs_encoding.BoardObserver()
+    for b in boards:
+        assert np.array_equal(legacy_get_obs(b), observer.observe(b))
+    incremental = per_call(observer.observe, boards)
+
+    print(f"per-square loop:       {legacy * 1e6:8.2f} us/board")
+    print(f"bitboard, new array:   {fresh * 1e6:8.2f} us/board")
+    print(f"bitboard, reused buf:  {reuse * 1e6:8.2f} us/board")
+    print(f"bitboard, batch {len(boards)}: {batched * 1e6:8.2f} us/board")
+    print(f"incremental observer:  {incremental * 1e6:8.2f} us/board (consecutive plies)")
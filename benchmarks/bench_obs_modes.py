@@ -0,0 +1,67 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import torch
+from stable_baselines3 import PPO
+from stable_baselines3.common.buffers import RolloutBuffer
+
+import obs_features
+from batched_env import BatchedChessEnv
+from bench_batched_env import steps_per_sec
+from chess_env import OBS_MODES
+
+
+def rollout_buffer_mb(env, n_steps):
+    buffer = RolloutBuffer(n_steps, env.observation_space, env.action_space, device="cpu", n_envs=env.num_envs)
+    return buffer.observations.nbytes / 2 ** 20
+
+
+def expand_per_sec(env, batch_size, repeat=20):
+    # Observations a training minibatch turns into policy features per second
+    model = PPO("MlpPolicy", env, n_steps=8, batch_size=8, device="cpu",
+                policy_kwargs=obs_features.policy_kwargs(env.obs_mode))
+    obs = np.repeat(env.reset(), -(-batch_size // env.num_envs), axis=0)[:batch_size]
+    with torch.no_grad():
+        tensor, _ = model.policy.obs_to_tensor(obs)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            model.policy.extract_features(tensor, model.policy.features_extractor)
+    return repeat * batch_size / (time.perf_counter() - start)
+
+
+def learn_per_sec(env, n_steps):
+    model = PPO("MlpPolicy", env, n_steps=n_steps, batch_size=256, n_epochs=1, device="cpu",
+                policy_kwargs=obs_features.policy_kwargs(env.obs_mode))
+    start = time.perf_counter()
+    model.learn(n_steps * env.num_envs)
+    return n_steps * env.num_envs / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num-envs", type=int, default=16)
+    parser.add_argument("--n-steps", type=int, default=2048, help="rollout length for the memory figures")
+    parser.add_argument("--steps", type=int, default=200, help="env steps timed per mode")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--learn", action="store_true", help="also time a short PPO.learn per mode")
+    args = parser.parse_args()
+    torch.set_num_threads(1)
+
+    print(f"{'mode':<8} {'bytes/obs':>9} {'rollout MB':>11} {'env-steps/s':>12} {'expand obs/s':>13}"
+          + (f" {'learn steps/s':>14}" if args.learn else ""))
+    for mode in OBS_MODES:
+        env = BatchedChessEnv(args.num_envs, obs_mode=mode)
+        obs_bytes = env.buf_obs[0].nbytes
+        line = (f"{mode:<8} {obs_bytes:>9} {rollout_buffer_mb(env, args.n_steps):>11.1f} "
+                f"{steps_per_sec(env, args.steps):>12.0f} {expand_per_sec(env, args.batch_size):>13.0f}")
+        if args.learn:
+            line += f" {learn_per_sec(env, 256):>14.0f}"
+        print(line)
+        env.close()
+    print(f"(rollout MB: observations of n_steps={args.n_steps} x n_envs={args.num_envs})")
@@ -0,0 +1,105 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chess
+import chess.pgn
+import chess.polyglot
+import numpy as np
+
+import obs_encoding
+import opening_book
+import policy
+
+GAMES = 4000
+OPENINGS = [
+    "e2e4 e7e5 g1f3 b8c6 f1b5 a7a6 b5a4 g8f6 e1g1 f8e7 f1e1 b7b5",
+    "e2e4 e7e5 g1f3 b8c6 f1c4 f8c5 c2c3 g8f6 d2d3 d7d6 e1g1 e8g8",
+    "e2e4 c7c5 g1f3 d7d6 d2d4 c5d4 f3d4 g8f6 b1c3 a7a6 c1e3 e7e5",
+    "d2d4 d7d5 c2c4 e7e6 b1c3 g8f6 c1g5 f8e7 e2e3 e8g8 g1f3 h7h6",
+    "d2d4 g8f6 c2c4 g7g6 b1c3 f8g7 e2e4 d7d6 g1f3 e8g8 f1e2 e7e5",
+    "c2c4 e7e5 b1c3 g8f6 g1f3 b8c6 g2g3 d7d5 c4d5 f6d5 f1g2 d5b6",
+]
+
+
+def write_games(path, seed=0):
+    # Known openings cut at a random ply, then random play, so the book has
+    # a realistic branching tree near the root
+    rng = np.random.default_rng(seed)
+    with open(path, "w") as f:
+        for _ in range(GAMES):
+            board = chess.Board()
+            opening = OPENINGS[rng.integers(len(OPENINGS))].split()
+            for uci in opening[:rng.integers(4, len(opening) + 1)]:
+                board.push_uci(uci)
+            for _ in range(20):
+                moves = list(board.legal_moves)
+                if not moves:
+                    break
+                board.push(moves[rng.integers(len(moves))])
+            game = chess.pgn.Game.from_board(board)
+            game.headers["Result"] = ["1-0", "0-1", "1/2-1/2"][rng.integers(3)]
+            f.write(str(game) + "\n\n")
+
+
+def book_positions(book, n, seed=0):
+    # Positions reached by following the book from the start
+    rng = random.Random(seed)
+    boards = []
+    while len(boards) < n:
+        board = chess.Board()
+        while len(boards) < n:
+            move = book.choose(board, rng=rng)
+            if move is None:
+                break
+            boards.append(board.copy())
+            board.push(move)
+    return boards
+
+
+def per_move(fn, boards, repeat=3):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for board in boards:
+            fn(board)
+    return (time.perf_counter() - start) / (repeat * len(boards)) * 1e6
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("model", nargs="?", help="checkpoint to compare against (default: a freshly initialised MlpPolicy)")
+    parser.add_argument("--positions", type=int, default=300)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pgn = os.path.join(tmp, "games.pgn")
+        path = os.path.join(tmp, "book.bin")
+        write_games(pgn)
+        start = time.perf_counter()
+        entries = opening_book.build([pgn], path, progress=False)
+        print(f"build: {GAMES} games -> {entries} entries ({entries * 16 / 1024:.0f} KiB) "
+              f"in {time.perf_counter() - start:.2f}s")
+
+        book = opening_book.OpeningBook(path)
+        boards = book_positions(book, args.positions)
+        print(f"{len(boards)} in-book positions")
+        reader = chess.polyglot.open_reader(path)
+        print(f"{'book lookup':<26} {per_move(book.choose, boards):10.1f} us/move")
+        print(f"{'python-chess polyglot':<26} {per_move(reader.weighted_choice, boards):10.1f} us/move")
+
+        if args.model:
+            model = policy.load_policy(args.model)
+        else:
+            from stable_baselines3 import PPO
+            from chess_env import ChessEnv
+            model = PPO("MlpPolicy", ChessEnv(), device="cpu")
+        observer = obs_encoding.BoardObserver()
+        print(f"{'policy.predict_move':<26} "
+              f"{per_move(lambda board: policy.predict_move(model, board, observer), boards):10.1f} us/move")
+        reader.close()
+        book.close()
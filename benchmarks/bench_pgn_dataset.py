@@ -0,0 +1,58 @@
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chess
+import chess.pgn
+import numpy as np
+
+import obs_encoding
+import pgn_dataset
+
+GAMES = 400
+BATCH_SIZE = 256
+
+
+def write_games(path, seed=0):
+    rng = np.random.default_rng(seed)
+    with open(path, "w") as f:
+        for _ in range(GAMES):
+            board = chess.Board()
+            while not board.is_game_over() and len(board.move_stack) < 120:
+                moves = list(board.legal_moves)
+                board.push(moves[rng.integers(len(moves))])
+            game = chess.pgn.Game.from_board(board)
+            game.headers["Result"] = board.result(claim_draw=True) if board.is_game_over() else "1/2-1/2"
+            f.write(str(game) + "\n\n")
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        pgn = os.path.join(tmp, "games.pgn")
+        out = os.path.join(tmp, "dataset")
+        write_games(pgn)
+
+        start = time.perf_counter()
+        positions = pgn_dataset.build([pgn], out, shard_size=10_000, progress=False)
+        elapsed = time.perf_counter() - start
+        print(f"build: {positions} positions, {positions / elapsed:.0f} positions/s with {os.cpu_count()} workers")
+        float_bytes = int(np.prod(obs_encoding.OBS_SHAPE)) * 4
+        print(f"storage: 96 bytes/position packed vs {float_bytes} as float32 ({float_bytes / 96:.0f}x)")
+
+        dataset = pgn_dataset.PositionDataset(out)
+        for packed in (True, False):
+            start = time.perf_counter()
+            seen = 0
+            for obs, actions, results in dataset.batches(BATCH_SIZE, seed=0, packed=packed):
+                seen += len(actions)
+            elapsed = time.perf_counter() - start
+            label = "packed batches" if packed else "float32 batches"
+            print(f"{label:<16} {seen / elapsed:12.0f} positions/s")
+
+        start = time.perf_counter()
+        for i in range(2000):
+            dataset[i]
+        print(f"{'random access':<16} {2000 / (time.perf_counter() - start):12.0f} positions/s")
@@ -0,0 +1,78 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chess
+import numpy as np
+
+import policy
+from prediction_cache import PredictionCache
+from search import PolicySearch
+
+
+def replay(model, cache, games, plies, undo_every, seed=0):
+    # Greedy games from the start position with random replies, stepping
+    # back and forth like Undo/Redo in the GUI
+    rng = np.random.default_rng(seed)
+    start = time.perf_counter()
+    for _ in range(games):
+        board = chess.Board()
+        for ply in range(plies):
+            if board.is_game_over():
+                break
+            if board.turn == chess.WHITE:
+                board.push(policy.predict_move(model, board, cache=cache))
+            else:
+                moves = list(board.legal_moves)
+                board.push(moves[rng.integers(min(len(moves), 3))])
+            if undo_every and ply % undo_every == undo_every - 1 and len(board.move_stack) >= 2:
+                redo = [board.pop(), board.pop()][::-1]
+                policy.predict_move(model, board, cache=cache)
+                for move in redo:
+                    board.push(move)
+    return time.perf_counter() - start
+
+
+def searched(model, cache, plies, nodes):
+    search = PolicySearch(model, nodes=nodes, cache=cache)
+    board = chess.Board()
+    start = time.perf_counter()
+    for _ in range(plies):
+        move = search.search(board)
+        if move is None:
+            break
+        board.push(move)
+    return time.perf_counter() - start
+
+
+def report(name, seconds, cache):
+    rate = f"{cache.hit_rate:6.1%} hits ({cache.hits} memory, {cache.disk_hits} disk)" if cache else ""
+    print(f"{name:<28} {seconds * 1000:8.1f} ms  {rate}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("model", help="exported policy or PPO checkpoint path, without extension")
+    parser.add_argument("--games", type=int, default=20)
+    parser.add_argument("--plies", type=int, default=30)
+    parser.add_argument("--nodes", type=int, default=200)
+    args = parser.parse_args()
+
+    model = policy.load_policy(args.model)
+    report("greedy, no cache", replay(model, None, args.games, args.plies, 4), None)
+    cache = PredictionCache()
+    report("greedy, cached", replay(model, cache, args.games, args.plies, 4), cache)
+
+    report("search, no cache", searched(model, None, 6, args.nodes), None)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.cache")
+        cache = PredictionCache(path=path)
+        report("search, cold disk cache", searched(model, cache, 6, args.nodes), cache)
+        cache.flush()
+        # A new process would start with an empty memory LRU
+        cache = PredictionCache(path=path)
+        report("search, warm disk cache", searched(model, cache, 6, args.nodes), cache)
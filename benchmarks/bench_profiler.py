@@ -0,0 +1,38 @@
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from profiler import Profiler
+
+CALLS = 200_000
+
+
+def per_call(fn):
+    start = time.perf_counter()
+    for _ in range(CALLS):
+        fn()
+    return (time.perf_counter() - start) / CALLS * 1e9
+
+
+def overhead(profiler):
+    @profiler.timed("decorated")
+    def decorated():
+        pass
+
+    def with_stage():
+        with profiler.stage("stage"):
+            pass
+
+    return per_call(with_stage), per_call(decorated)
+
+
+if __name__ == "__main__":
+    baseline = per_call(lambda: None)
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, profiler in [("disabled", Profiler()), ("HUD", Profiler(enabled=True)),
+                               ("HUD + trace", Profiler(trace_path=os.path.join(tmp, "trace.json")))]:
+            stage, decorated = overhead(profiler)
+            print(f"{name:<12} stage(): {stage - baseline:7.0f} ns/call   @timed: {decorated - baseline:7.0f} ns/call")
@@ -0,0 +1,58 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame
+
+from recorder import GameRecorder
+
+SIZE = (800, 640)
+
+
+# What run_game did before the recorder: convert and keep every frame
+def legacy_capture(screen, frames):
+    frame_str = pygame.image.tostring(screen, 'RGB')
+    frame_surf = pygame.image.fromstring(frame_str, SIZE, 'RGB')
+    frames.append(pygame.surfarray.array3d(frame_surf).swapaxes(0, 1))
+
+
+def run(capture, frames, screen, fps):
+    clock = pygame.time.Clock()
+    elapsed = 0
+    tracemalloc.start()
+    for i in range(frames):
+        screen.fill((i % 255, 80, 160))
+        start = time.perf_counter()
+        capture(screen)
+        elapsed += time.perf_counter() - start
+        clock.tick(fps)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed / frames * 1000, peak / 2 ** 20
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--fps", type=int, default=30)
+    args = parser.parse_args()
+    pygame.init()
+    screen = pygame.Surface(SIZE)
+
+    kept = []
+    ms, peak = run(lambda s: legacy_capture(s, kept), args.frames, screen, args.fps)
+    print(f"legacy list:   {ms:6.2f} ms/frame on the UI thread, peak {peak:8.1f} MB")
+    del kept
+
+    with tempfile.TemporaryDirectory() as tmp:
+        recorder = GameRecorder(os.path.join(tmp, "bench.mp4"))
+        ms, peak = run(recorder.capture, args.frames, screen, args.fps)
+        recorder.close()
+        print(f"GameRecorder:  {ms:6.2f} ms/frame on the UI thread, peak {peak:8.1f} MB "
+              f"({recorder.captured} encoded, {recorder.dropped} dropped)")
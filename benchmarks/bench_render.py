@@ -0,0 +1,97 @@
+import argparse
+import os
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chess
+import pygame
+
+import mainGui
+
+
+def legacy_frame(screen, board, images, font, selected, legal, last_move):
+    screen.fill((30, 30, 30))
+    board_surface = screen.subsurface((0, 0, mainGui.WIDTH, mainGui.HEIGHT))
+    mainGui.draw_board(board_surface, board, images, selected, legal, last_move)
+    pygame.draw.rect(screen, (60, 60, 60), (mainGui.WIDTH, 0, mainGui.PANEL_WIDTH, mainGui.HEIGHT))
+    for i in range(12):
+        screen.blit(font.render(f"label {i}", True, mainGui.WHITE), (mainGui.WIDTH + 10, 250 + i * 20))
+    pygame.display.flip()
+
+
+def retained_frame(renderer, panel, board, font, selected, legal, last_move):
+    renderer.draw(board, selected, legal, last_move)
+    panel.begin()
+    for i in range(12):
+        panel.text(i, f"label {i}", font, (mainGui.WIDTH + 10, 250 + i * 20))
+    dirty = renderer.take_dirty() + panel.take_dirty()
+    if dirty:
+        pygame.display.update(dirty)
+    return dirty
+
+
+def measure(loop, seconds):
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    frames = loop(seconds)
+    wall = time.perf_counter() - wall
+    cpu = time.process_time() - cpu
+    return frames, cpu / wall
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=3)
+    args = parser.parse_args()
+
+    screen = pygame.display.set_mode((mainGui.WIDTH + mainGui.PANEL_WIDTH, mainGui.HEIGHT))
+    images = mainGui.load_piece_images("classic")
+    font = pygame.font.SysFont(None, 24)
+    board = chess.Board()
+    board.push_san("e4")
+    selected, legal, last_move = chess.G1, [chess.F3, chess.H3], board.peek()
+    clock = pygame.time.Clock()
+
+    def legacy(seconds):
+        frames, end = 0, time.perf_counter() + seconds
+        while time.perf_counter() < end:
+            legacy_frame(screen, board, images, font, selected, legal, last_move)
+            pygame.event.get()
+            clock.tick(mainGui.FPS)
+            frames += 1
+        return frames
+
+    renderer = mainGui.BoardRenderer(screen, images)
+    panel = mainGui.PanelRenderer(screen, [])
+
+    def retained(seconds, idle=False):
+        frames, end = 0, time.perf_counter() + seconds
+        while time.perf_counter() < end:
+            dirty = retained_frame(renderer, panel, board, font, selected, legal, last_move)
+            if not dirty and idle:
+                pygame.event.wait(1000)
+            pygame.event.get()
+            clock.tick(mainGui.FPS)
+            frames += 1
+        return frames
+
+    start = time.perf_counter()
+    for _ in range(100):
+        legacy_frame(screen, board, images, font, selected, legal, last_move)
+    legacy_ms = (time.perf_counter() - start) * 10
+    retained_frame(renderer, panel, board, font, selected, legal, last_move)
+    start = time.perf_counter()
+    for _ in range(100):
+        retained_frame(renderer, panel, board, font, selected, legal, last_move)
+    retained_ms = (time.perf_counter() - start) * 10
+
+    print(f"full redraw + flip:        {legacy_ms:6.3f} ms/frame")
+    print(f"dirty rects, no change:    {retained_ms:6.3f} ms/frame")
+    for name, loop in [("full redraw @30 FPS", legacy), ("dirty rects @30 FPS", retained),
+                       ("dirty rects + idle wait", lambda s: retained(s, idle=True))]:
+        frames, cpu = measure(loop, args.seconds)
+        print(f"{name:<24} {frames:5d} frames, CPU {cpu:6.1%} of one core while waiting")
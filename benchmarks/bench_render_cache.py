@@ -0,0 +1,86 @@
+import os
+import sys
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chess
+import pygame
+
+import mainGui
+
+FRAMES = 30
+counts = {"surfaces": 0}
+_Surface = pygame.Surface
+_SysFont = pygame.font.SysFont
+
+
+class CountingSurface(_Surface):
+    def __init__(self, *args, **kwargs):
+        counts["surfaces"] += 1
+        super().__init__(*args, **kwargs)
+
+
+class CountingFont:
+    def __init__(self, font):
+        self.font = font
+
+    def render(self, *args, **kwargs):
+        counts["surfaces"] += 1
+        return self.font.render(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.font, name)
+
+
+def counting_sysfont(*args, **kwargs):
+    counts["surfaces"] += 1
+    return CountingFont(_SysFont(*args, **kwargs))
+
+
+def script_events(frames, final):
+    # Feed empty event lists for `frames` polls, then the event that exits
+    polls = {"n": 0}
+
+    def get(*args, **kwargs):
+        pygame.event.pump()
+        polls["n"] += 1
+        return [final] if polls["n"] > frames else []
+    return get
+
+
+def per_frame(fn, final):
+    pygame.event.get = script_events(FRAMES, final)
+    counts["surfaces"] = 0
+    fn()
+    return counts["surfaces"] / (FRAMES + 1)
+
+
+def click(x, y):
+    return pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=(x, y), button=1)
+
+
+if __name__ == "__main__":
+    screen = mainGui.screen
+    images = mainGui.load_piece_images("classic")
+    pygame.Surface = CountingSurface
+    pygame.font.SysFont = counting_sysfont
+
+    board = chess.Board()
+    board.push_san("e4")
+    counts["surfaces"] = 0
+    for _ in range(FRAMES):
+        mainGui.draw_board(screen, board, images, chess.G1, [chess.F3, chess.H3], board.peek())
+    results = {"draw_board": counts["surfaces"] / FRAMES}
+
+    results["choose_promotion"] = per_frame(
+        lambda: mainGui.choose_promotion(screen, images, chess.WHITE),
+        pygame.event.Event(pygame.KEYDOWN, key=pygame.K_RETURN))
+    results["show_settings"] = per_frame(
+        lambda: mainGui.show_settings(screen, {}), click(mainGui.WIDTH // 2, mainGui.HEIGHT - 100))
+    results["show_play_menu"] = per_frame(lambda: mainGui.show_play_menu(screen), click(0, 150))
+    results["show_color_selection"] = per_frame(lambda: mainGui.show_color_selection(screen), click(0, 150))
+
+    for name, value in results.items():
+        print(f"{name:<22} {value:6.2f} surface/font allocations per frame")
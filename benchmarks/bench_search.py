@@ -0,0 +1,40 @@
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chess
+
+import policy
+from search import PolicySearch
+
+
+def play(model, batch_size, nodes, plies):
+    # Self-play a short game, reusing the tree between plies
+    search = PolicySearch(model, nodes=nodes, batch_size=batch_size)
+    board = chess.Board()
+    totals = {"simulations": 0, "reused": 0, "evaluated": 0, "batches": 0, "seconds": 0.0}
+    for _ in range(plies):
+        move = search.search(board)
+        if move is None:
+            break
+        for key in totals:
+            totals[key] += search.stats[key]
+        board.push(move)
+    return totals
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("model", help="exported policy or PPO checkpoint path, without extension")
+    parser.add_argument("--nodes", type=int, default=400)
+    parser.add_argument("--plies", type=int, default=20)
+    args = parser.parse_args()
+
+    model = policy.load_policy(args.model)
+    for batch_size in [1, 4, 16, 64]:
+        t = play(model, batch_size, args.nodes, args.plies)
+        print(f"batch {batch_size:>3}: {t['simulations'] / t['seconds']:8.0f} nodes/s, "
+              f"mean batch {t['evaluated'] / t['batches']:5.1f}, "
+              f"reused {t['reused'] / (t['reused'] + t['simulations']):5.1%} of visits")
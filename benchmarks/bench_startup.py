@@ -0,0 +1,43 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs mainGui.py as a script and exits at its first display.flip/update,
+# printing the wall-clock timestamp of that first frame
+CHILD = """
+import os, runpy, sys, time
+import pygame
+
+def first_frame(*args, **kwargs):
+    sys.stdout.write(repr(time.time()) + "\\n")
+    sys.stdout.flush()
+    os._exit(0)
+
+pygame.display.flip = first_frame
+pygame.display.update = first_frame
+sys.argv = ["mainGui.py"]
+runpy.run_path("mainGui.py", run_name="__main__")
+"""
+
+
+def time_to_first_frame():
+    env = dict(os.environ)
+    env.setdefault("SDL_VIDEODRIVER", "dummy")
+    env.setdefault("SDL_AUDIODRIVER", "dummy")
+    start = time.time()
+    out = subprocess.run([sys.executable, "-c", CHILD], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    return (float(out.strip().splitlines()[-1]) - start) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    times = sorted(time_to_first_frame() for _ in range(args.runs))
+    print(f"time to first frame: median {times[len(times) // 2]:7.1f} ms, "
+          f"min {times[0]:7.1f} ms, max {times[-1]:7.1f} ms over {args.runs} runs")
@@ -0,0 +1,235 @@
+import argparse
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import chess
+import numpy as np
+
+import move_encoding
+import obs_encoding
+import policy
+
+BENCHMARKS = {}
+
+# Absolute slack on top of the relative tolerance, for metrics that can
+# legitimately sit at or near zero
+SLACK = {"fallback_rate": 0.01}
+
+
+def benchmark(fn):
+    BENCHMARKS[fn.__name__] = fn
+    return fn
+
+
+def best_time(fn, number, repeat=7):
+    # Best of several repeats of the mean time per call, in seconds; the
+    # minimum is the least noisy estimate on a busy machine
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - start) / number)
+    return min(times)
+
+
+def sample_boards(n, seed=0):
+    rng = np.random.default_rng(seed)
+    board, boards = chess.Board(), []
+    while len(boards) < n:
+        if board.is_game_over():
+            board.reset()
+        moves = list(board.legal_moves)
+        board.push(moves[rng.integers(len(moves))])
+        boards.append(board.copy())
+    return boards
+
+
+@benchmark
+def env(args):
+    from chess_env import ChessEnv
+    env = ChessEnv()
+    rng = np.random.default_rng(0)
+    boards = itertools.cycle(sample_boards(1000))
+
+    def step():
+        action = rng.choice(np.flatnonzero(env.action_masks()))
+        if env.step(action)[2]:
+            env.reset()
+
+    def encode():
+        env.board = next(boards)
+        env._get_obs()
+
+    env.reset()
+    return {
+        "env_construct": (best_time(ChessEnv, 100) * 1e3, "ms"),
+        "env_reset": (best_time(env.reset, 1000) * 1e6, "us"),
+        "env_step": (best_time(step, 1000) * 1e6, "us"),
+        "obs_encode": (best_time(encode, 1000) * 1e6, "us"),
+    }
+
+
+def model_paths(args):
+    if args.models:
+        return args.models
+    return [f"chess_agent/ppo_{d}" for d in ["easy", "medium", "hard", "pro"]
+            if os.path.exists(os.path.join(ROOT, f"chess_agent/ppo_{d}.npz"))
+            or os.path.exists(os.path.join(ROOT, f"chess_agent/ppo_{d}.zip"))]
+
+
+@benchmark
+def inference(args):
+    # Per checkpoint: the model's forward pass alone (one position, and per
+    # position in a batch of 64), the GUI's whole move selection around it
+    # (encoding, masking, decoding), and how often the unmasked policy picks
+    # an illegal action that the env replaces with a random one
+    results = {}
+    boards = sample_boards(300, seed=1)
+    obs = obs_encoding.encode_boards(boards)
+    for path in model_paths(args):
+        name = os.path.basename(path)
+        model = policy.load_policy(os.path.join(ROOT, path))
+        observer = obs_encoding.BoardObserver()
+        positions = itertools.cycle(boards)
+        rows = itertools.cycle(range(len(obs)))
+        forward = best_time(lambda: policy.policy_evaluate(model, obs[next(rows)][None]), 100)
+        batch = best_time(lambda: policy.policy_evaluate(model, obs[:64]), 20) / 64
+        latency = best_time(lambda: policy.predict_move(model, next(positions), observer), 100)
+        logits, _ = policy.policy_evaluate(model, obs)
+        masks = np.array([move_encoding.legal_mask(board) for board in boards])
+        illegal = ~masks[np.arange(len(boards)), np.argmax(logits, axis=1)]
+        results[f"forward[{name}]"] = (forward * 1e6, "us")
+        results[f"forward_batch64[{name}]"] = (batch * 1e6, "us")
+        results[f"predict[{name}]"] = (latency * 1e6, "us")
+        results[f"fallback_rate[{name}]"] = (float(illegal.mean()), "ratio")
+    return results
+
+
+@benchmark
+def frame(args):
+    import pygame
+    import mainGui
+    screen = pygame.display.set_mode((mainGui.WIDTH + mainGui.PANEL_WIDTH, mainGui.HEIGHT))
+    images = mainGui.load_piece_images("classic")
+    board = chess.Board()
+    board.push_san("e4")
+    selected, legal, last_move = chess.G1, [chess.F3, chess.H3], board.peek()
+
+    def full():
+        mainGui.draw_board(screen, board, images, selected, legal, last_move)
+        pygame.display.flip()
+
+    renderer = mainGui.BoardRenderer(screen, images)
+    moves = itertools.cycle(chess.Move.from_uci(uci) for uci in ["g1f3", "g8f6", "f3g1", "f6g8"])
+    played = chess.Board()
+
+    def retained():
+        # One piece moves each frame, as in play
+        played.push(next(moves))
+        renderer.draw(played, None, [], played.peek())
+        dirty = renderer.take_dirty()
+        if dirty:
+            pygame.display.update(dirty)
+
+    return {
+        "frame_draw_board_flip": (best_time(full, 50) * 1e3, "ms"),
+        "frame_dirty_update": (best_time(retained, 50) * 1e3, "ms"),
+    }
+
+
+@benchmark
+def startup(args):
+    import bench_startup
+    times = sorted(bench_startup.time_to_first_frame() for _ in range(args.startup_runs))
+    return {"startup_first_frame": (times[len(times) // 2], "ms")}
+
+
+def metadata():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "python": platform.python_version(),
+        "system": platform.system(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "commit": commit,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+# Timings are only comparable on the same kind of machine
+COMPARABLE_META = ["system", "machine", "cpus"]
+
+
+def meta_mismatch(meta, baseline_meta):
+    return [f"{key} {baseline_meta[key]} vs {meta[key]}" for key in COMPARABLE_META
+            if key in baseline_meta and baseline_meta[key] != meta[key]]
+
+
+def compare(results, baseline, tolerance):
+    # All metrics are lower-is-better; returns the names that regressed
+    regressed = []
+    print(f"\n{'metric':<34} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, entry in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<34} {'-':>12} {entry['value']:12.3f}      new")
+            continue
+        value, base_value = entry["value"], base["value"]
+        change = (value - base_value) / base_value if base_value else 0.0
+        slack = SLACK.get(name.split("[")[0], 0.0)
+        bad = value > base_value * (1 + tolerance) + slack
+        if bad:
+            regressed.append(name)
+        print(f"{name:<34} {base_value:12.3f} {value:12.3f} {change:+8.1%}{'  REGRESSION' if bad else ''}")
+    return regressed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the benchmark suite")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="run a subset")
+    parser.add_argument("--models", nargs="+", help="checkpoints for the inference benchmark (default: chess_agent/ppo_*)")
+    parser.add_argument("--startup-runs", type=int, default=3)
+    parser.add_argument("--output", help="write results to this JSON file (e.g. a new baseline)")
+    parser.add_argument("--compare", help="baseline JSON to compare against; exits 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown")
+    parser.add_argument("--force", action="store_true", help="compare even if the baseline is from another kind of machine")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        mismatch = meta_mismatch(metadata(), baseline.get("meta", {}))
+        if mismatch and not args.force:
+            parser.error(f"{args.compare} was recorded on a different machine ({', '.join(mismatch)}); "
+                         "record a baseline here with --output, or pass --force")
+
+    results = {}
+    for name in args.only or BENCHMARKS:
+        for metric, (value, unit) in BENCHMARKS[name](args).items():
+            results[metric] = {"value": value, "unit": unit}
+            print(f"{metric:<34} {value:12.3f} {unit}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"meta": metadata(), "results": results}, f, indent=2)
+    if baseline is not None:
+        regressed = compare(results, baseline["results"], args.tolerance)
+        if regressed:
+            print(f"\n{len(regressed)} regression(s): {', '.join(regressed)}")
+            raise SystemExit(1)
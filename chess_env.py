@@ -3,73 +3,80 @@ import gymnasium as gym
 from gymnasium import spaces
 import numpy as np
 import random
+import move_encoding
+import obs_encoding
+from game_state import position_outcome
+
+# float32 and uint8 both give the 8x8x12 piece planes; packed gives the
+# bitboards and state bytes of obs_encoding.pack_board (see obs_features.py)
+OBS_MODES = ("float32", "uint8", "packed")
+
+
+def observation_space(obs_mode="float32"):
+    if obs_mode == "packed":
+        return spaces.Box(low=0, high=255, shape=(obs_encoding.PACKED_SIZE,), dtype=np.uint8)
+    if obs_mode not in OBS_MODES:
+        raise ValueError(f"unknown obs_mode {obs_mode!r}, expected one of {OBS_MODES}")
+    return spaces.Box(low=0, high=1, shape=obs_encoding.OBS_SHAPE, dtype=np.dtype(obs_mode))
+
+
+def encode_observations(boards, obs_mode, out=None):
+    if obs_mode == "packed":
+        return obs_encoding.pack_boards(boards, out)
+    if out is None:
+        out = np.empty((len(boards),) + obs_encoding.OBS_SHAPE, dtype=np.dtype(obs_mode))
+    return obs_encoding.encode_boards(boards, out)
+
+def apply_action(board, action, rng=random, mask=None):
+    # mask holds the legal actions of the current position and is refreshed
+    # in place for the next one, so each ply generates legal moves once
+    if mask is None:
+        mask = move_encoding.legal_mask(board)
+    if not (0 <= action < move_encoding.ACTION_SIZE and mask[action]):
+        action = rng.choice(np.flatnonzero(mask))
+    move = move_encoding.decode(action, board)
+
+    board.push(move)
+    move_encoding.legal_mask(board, mask)
+
+    outcome = position_outcome(board, mask)
+    if outcome is None:
+        return 0, False
+    if outcome.winner is None:
+        return 0, True
+    return (1 if outcome.winner == chess.WHITE else -1), True
 
 class ChessEnv(gym.Env):
-    def __init__(self):
+    def __init__(self, obs_mode="float32"):
         super().__init__()
         self.board = chess.Board()
-        self.observation_space = spaces.Box(low=0, high=1, shape=(8, 8, 12), dtype=np.float32)
-        self.action_space = spaces.Discrete(4672)
-        self.all_moves = self._generate_all_moves()
-
-
-    def _generate_all_moves(self):
-        moves = []
-        for from_square in chess.SQUARES:
-            for to_square in chess.SQUARES:
-                for promo in [None, chess.QUEEN, chess.ROOK, chess.BISHOP, chess.KNIGHT]:
-                    try:
-                        move = chess.Move(from_square, to_square, promotion=promo)
-                        chess.Board().push(move)
-                        moves.append(move)
-                    except:
-                        continue
-        return moves
+        self.obs_mode = obs_mode
+        self.observation_space = observation_space(obs_mode)
+        self.action_space = spaces.Discrete(move_encoding.ACTION_SIZE)
+        self.all_moves = move_encoding.ACTION_MOVES
+        self._mask = move_encoding.legal_mask(self.board)
 
 
     def _decode_action(self, action):
-        if 0 <= action < len(self.all_moves):
-            return self.all_moves[action]
-        return chess.Move.null()
+        return move_encoding.decode(action, self.board)
 
     def reset(self, seed=None, options=None):
         super().reset(seed=seed)
         self.board.reset()
+        move_encoding.legal_mask(self.board, self._mask)
         return self._get_obs(), {}
 
-    def _get_obs(self):
-        obs = np.zeros((8, 8, 12), dtype=np.float32)
-        for sq in chess.SQUARES:
-            piece = self.board.piece_at(sq)
-            if piece:
-                idx = self._piece_to_index(piece)
-                obs[sq // 8, sq % 8, idx] = 1
-        return obs
-
-    def _piece_to_index(self, piece):
-        mapping = {
-            chess.PAWN: 0, chess.KNIGHT: 1, chess.BISHOP: 2,
-            chess.ROOK: 3, chess.QUEEN: 4, chess.KING: 5
-        }
-        return mapping[piece.piece_type] + (0 if piece.color == chess.WHITE else 6)
-
-    def step(self, action):
-        move = self._decode_action(action)
+    def action_masks(self):
+        return self._mask
 
-        if move not in self.board.legal_moves:
-            move = random.choice(list(self.board.legal_moves))
-
-        self.board.push(move)
-
-        reward = 0
-        done = False
-        if self.board.is_game_over():
-            result = self.board.result()
-            if result == "1-0":
-                reward = 1
-            elif result == "0-1":
-                reward = -1
-            done = True
+    def _get_obs(self, out=None):
+        if self.obs_mode == "packed":
+            return obs_encoding.pack_board(self.board, out)
+        if out is None:
+            out = np.empty(obs_encoding.OBS_SHAPE, dtype=self.observation_space.dtype)
+        return obs_encoding.encode_board(self.board, out)
 
+    def step(self, action):
+        reward, done = apply_action(self.board, action, mask=self._mask)
         return self._get_obs(), reward, done, False, {}
 
@@ -0,0 +1,109 @@
+import argparse
+import os
+
+import numpy as np
+import torch
+from stable_baselines3 import PPO
+
+from numpy_policy import NumpyPolicy
+
+ACTIVATION_NAMES = {torch.nn.Tanh: "tanh", torch.nn.ReLU: "relu"}
+
+
+def _linear_layers(state, net):
+    return sorted(
+        int(k.split(".")[2]) for k in state if k.startswith(f"mlp_extractor.{net}.") and k.endswith(".weight")
+    )
+
+
+def policy_arrays(policy):
+    # NumPy arrays of an SB3 ActorCriticPolicy in the layout NumpyPolicy loads
+    if policy.activation_fn not in ACTIVATION_NAMES:
+        raise ValueError(f"unsupported activation {policy.activation_fn.__name__}")
+    state = {k: v.detach().cpu().numpy().astype(np.float32) for k, v in policy.state_dict().items()}
+    arrays = {"activation": np.array(ACTIVATION_NAMES[policy.activation_fn])}
+    for prefix, net in [("pi", "policy_net"), ("vf", "value_net")]:
+        for i, index in enumerate(_linear_layers(state, net)):
+            arrays[f"{prefix}_{i}_weight"] = state[f"mlp_extractor.{net}.{index}.weight"]
+            arrays[f"{prefix}_{i}_bias"] = state[f"mlp_extractor.{net}.{index}.bias"]
+    arrays["action_weight"] = state["action_net.weight"]
+    arrays["action_bias"] = state["action_net.bias"]
+    arrays["value_weight"] = state["value_net.weight"]
+    arrays["value_bias"] = state["value_net.bias"]
+    return arrays
+
+
+def load_policy_arrays(policy, arrays):
+    # Inverse of policy_arrays, into a policy with the same architecture
+    state = policy.state_dict()
+    names = {"action_weight": "action_net.weight", "action_bias": "action_net.bias",
+             "value_weight": "value_net.weight", "value_bias": "value_net.bias"}
+    for prefix, net in [("pi", "policy_net"), ("vf", "value_net")]:
+        for i, index in enumerate(_linear_layers(state, net)):
+            names[f"{prefix}_{i}_weight"] = f"mlp_extractor.{net}.{index}.weight"
+            names[f"{prefix}_{i}_bias"] = f"mlp_extractor.{net}.{index}.bias"
+    for key, name in names.items():
+        if state[name].shape != arrays[key].shape:
+            raise ValueError(f"{key}: shape {arrays[key].shape} does not match {tuple(state[name].shape)}")
+        state[name] = torch.as_tensor(np.asarray(arrays[key]))
+    policy.load_state_dict(state)
+
+
+def export(model_path, out_path=None):
+    model = PPO.load(model_path, device="cpu")
+    policy = model.policy
+    if type(policy.features_extractor).__name__ != "FlattenExtractor":
+        raise ValueError(f"{model_path}: only MlpPolicy with a flatten extractor can be exported")
+    try:
+        arrays = policy_arrays(policy)
+    except ValueError as exc:
+        raise ValueError(f"{model_path}: {exc}") from None
+
+    if out_path is None:
+        out_path = os.path.splitext(model_path)[0] + ".npz"
+    np.savez(out_path, **arrays)
+    return model, out_path
+
+
+def verify(model, npz_path, positions=200, seed=0, tie_tolerance=1e-4):
+    # Compare against SB3 on random 0/1 observations: raw logits, values and
+    # the deterministic action must agree (near-ties may round either way)
+    numpy_policy = NumpyPolicy.load(npz_path)
+    rng = np.random.default_rng(seed)
+    obs = (rng.random((positions,) + model.observation_space.shape) < 0.05).astype(np.float32)
+    policy = model.policy
+    with torch.no_grad():
+        obs_tensor, _ = policy.obs_to_tensor(obs)
+        features = policy.extract_features(obs_tensor)
+        expected = policy.action_net(policy.mlp_extractor.forward_actor(features)).numpy()
+        expected_values = policy.predict_values(obs_tensor).numpy()[:, 0]
+    actions, _ = model.predict(obs, deterministic=True)
+    logits = numpy_policy.logits(obs)
+    max_error = float(np.abs(logits - expected).max())
+    value_error = float(np.abs(numpy_policy.values(obs) - expected_values).max())
+    top2 = np.sort(expected, axis=1)[:, -2:]
+    decisive = top2[:, 1] - top2[:, 0] > tie_tolerance
+    mismatches = int(np.sum((np.argmax(logits, axis=1) != actions) & decisive))
+    return max_error, value_error, mismatches
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export PPO checkpoints to NumPy .npz policies")
+    parser.add_argument("models", nargs="*", help="checkpoint paths (default: chess_agent/ppo_*)")
+    parser.add_argument("--verify", action="store_true", help="check parity with model.predict")
+    args = parser.parse_args()
+
+    models = args.models or [f"chess_agent/ppo_{d}" for d in ["easy", "medium", "hard", "pro"]]
+    for path in models:
+        try:
+            model, out_path = export(path)
+        except FileNotFoundError:
+            print(f"{path}: not found, skipped")
+            continue
+        print(f"{path} -> {out_path}")
+        if args.verify:
+            max_error, value_error, mismatches = verify(model, out_path)
+            print(f"  max |logit diff| {max_error:.2e}, max |value diff| {value_error:.2e}, "
+                  f"action mismatches {mismatches}")
+            if mismatches:
+                raise SystemExit(1)
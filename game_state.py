@@ -0,0 +1,129 @@
+import chess
+import numpy as np
+
+import move_encoding
+
+
+def position_outcome(board, mask):
+    # Same rules as board.outcome(), but reusing the legal mask of the
+    # position instead of generating the legal moves again. This is the
+    # part shared with ChessEnv/BatchedChessEnv (via apply_action); the envs
+    # keep their own board and one reused mask, since GameState's per-ply
+    # history for Undo/Redo and SAN would cost memory and time on every step.
+    if not mask.any():
+        if board.is_check():
+            return chess.Outcome(chess.Termination.CHECKMATE, not board.turn)
+        return chess.Outcome(chess.Termination.STALEMATE, None)
+    if board.is_insufficient_material():
+        return chess.Outcome(chess.Termination.INSUFFICIENT_MATERIAL, None)
+    if board.is_seventyfive_moves():
+        return chess.Outcome(chess.Termination.SEVENTYFIVE_MOVES, None)
+    if board.is_fivefold_repetition():
+        return chess.Outcome(chess.Termination.FIVEFOLD_REPETITION, None)
+    return None
+
+
+class _Position:
+    __slots__ = ("mask", "outcome", "targets")
+
+    def __init__(self, board):
+        self.mask = move_encoding.legal_mask(board)
+        self.outcome = position_outcome(board, self.mask)
+        self.targets = None
+
+
+class GameState:
+    # Wraps a board and caches, per ply, what the game loop keeps asking:
+    # the legal mask and move targets, the outcome, and the SAN of each move.
+    # Positions popped by Undo stay cached, so Redo and the checks after it
+    # cost nothing. Mutate the board through push/pop/redo/reset.
+    def __init__(self, board=None):
+        self.board = board if board is not None else chess.Board()
+        self._moves = list(self.board.move_stack)
+        self._san = []
+        replay = self.board.root()
+        for move in self._moves:
+            self._san.append(replay.san(move))
+            replay.push(move)
+        self._positions = [None] * (len(self._moves) + 1)
+
+    @property
+    def ply(self):
+        return len(self.board.move_stack)
+
+    def _position(self):
+        ply = self.ply
+        position = self._positions[ply]
+        if position is None:
+            position = self._positions[ply] = _Position(self.board)
+        return position
+
+    @property
+    def mask(self):
+        return self._position().mask
+
+    @property
+    def outcome(self):
+        return self._position().outcome
+
+    def is_game_over(self):
+        return self._position().outcome is not None
+
+    def result(self):
+        outcome = self._position().outcome
+        return outcome.result() if outcome else "*"
+
+    def is_legal(self, move):
+        action = move_encoding.encode(move)
+        return action >= 0 and bool(self.mask[action]) and move_encoding.decode(action, self.board) == move
+
+    def targets(self, square):
+        # Destination squares of the legal moves from square
+        position = self._position()
+        if position.targets is None:
+            targets = {}
+            for action in np.flatnonzero(position.mask):
+                move = move_encoding.ACTION_MOVES[action]
+                squares = targets.setdefault(move.from_square, [])
+                if move.to_square not in squares:
+                    squares.append(move.to_square)
+            position.targets = targets
+        return position.targets.get(square, [])
+
+    def san_history(self):
+        return self._san[:self.ply]
+
+    def push(self, move):
+        ply = self.ply
+        if ply < len(self._moves) and self._moves[ply] == move:
+            # Replaying the undone line keeps its cached positions
+            self.board.push(move)
+            return
+        del self._moves[ply:], self._san[ply:], self._positions[ply + 1:]
+        self._san.append(self.board.san(move))
+        self._moves.append(move)
+        self._positions.append(None)
+        self.board.push(move)
+
+    def pop(self):
+        return self.board.pop()
+
+    def can_redo(self):
+        return self.ply < len(self._moves)
+
+    def redo_move(self):
+        # The move Redo would play next, or None
+        return self._moves[self.ply] if self.can_redo() else None
+
+    def redo(self):
+        if not self.can_redo():
+            return None
+        move = self._moves[self.ply]
+        self.board.push(move)
+        return move
+
+    def reset(self):
+        self.board.reset()
+        self._moves.clear()
+        self._san.clear()
+        self._positions = [None]
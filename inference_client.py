@@ -0,0 +1,121 @@
+import json
+import os
+import socket
+import struct
+import tempfile
+import threading
+
+import numpy as np
+
+import move_encoding
+import obs_encoding
+
+if hasattr(socket, "AF_UNIX"):
+    DEFAULT_ADDRESS = os.path.join(tempfile.gettempdir(), "chess_inference.sock")
+else:
+    DEFAULT_ADDRESS = "127.0.0.1:8765"
+
+# Requests: op, model name length, positions, then the name and 96 bytes of
+# piece bitboards per position. Replies: status and payload length, then the
+# payload (logits and values as float32, stats as JSON, or an error message).
+OP_EVALUATE = 1
+OP_STATS = 2
+OP_MODELS = 3
+REQUEST = struct.Struct("<BHI")
+REPLY = struct.Struct("<BI")
+STATUS_OK = 0
+STATUS_ERROR = 1
+POSITION_BYTES = 96
+
+
+def parse_address(address):
+    # "host:port" is localhost TCP, anything else a Unix socket path
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit() and os.sep not in address:
+        return socket.AF_INET, (host or "127.0.0.1", int(port))
+    return socket.AF_UNIX, address
+
+
+def recv_exact(sock, size):
+    buf = bytearray(size)
+    view = memoryview(buf)
+    while view:
+        n = sock.recv_into(view)
+        if not n:
+            raise ConnectionError("inference server closed the connection")
+        view = view[n:]
+    return buf
+
+
+def pack_obs(obs):
+    # (n, 8, 8, 12) planes -> (n, 96) bitboard bytes, as obs_encoding.board_masks
+    bits = np.asarray(obs).reshape(-1, 64, 12).transpose(0, 2, 1) != 0
+    return np.packbits(bits, axis=-1, bitorder="little").reshape(-1, POSITION_BYTES)
+
+
+def unpack_obs(packed, out):
+    masks = np.frombuffer(packed, dtype="<u8").reshape(-1, 12)
+    return obs_encoding.unpack_masks(masks, out)
+
+
+class RemotePolicy:
+    # Stands in for a loaded policy: policy_evaluate() sends the batch to an
+    # inference server (inference_server.py), which evaluates it together
+    # with other clients' requests. One connection, one request at a time.
+    def __init__(self, address, name):
+        self.address = address
+        self.name = name
+        self._name = name.encode()
+        self._sock = None
+        self._lock = threading.Lock()
+
+    def connect(self):
+        with self._lock:
+            if self._sock is None:
+                family, target = parse_address(self.address)
+                sock = socket.socket(family, socket.SOCK_STREAM)
+                try:
+                    sock.connect(target)
+                except OSError:
+                    sock.close()
+                    raise
+                if family == socket.AF_INET:
+                    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                self._sock = sock
+        return self
+
+    def close(self):
+        with self._lock:
+            if self._sock is not None:
+                self._sock.close()
+                self._sock = None
+
+    def _call(self, op, name=b"", positions=0, payload=b""):
+        self.connect()
+        with self._lock:
+            try:
+                self._sock.sendall(REQUEST.pack(op, len(name), positions) + name + payload)
+                status, size = REPLY.unpack(recv_exact(self._sock, REPLY.size))
+                reply = recv_exact(self._sock, size)
+            except OSError:
+                # A half-read reply would desync the stream; reconnect next call
+                self._sock.close()
+                self._sock = None
+                raise
+        if status != STATUS_OK:
+            raise RuntimeError(f"inference server: {reply.decode()}")
+        return reply
+
+    def evaluate(self, obs):
+        packed = pack_obs(obs)
+        n = len(packed)
+        reply = self._call(OP_EVALUATE, self._name, n, packed.tobytes())
+        logits = np.frombuffer(reply, dtype=np.float32, count=n * move_encoding.ACTION_SIZE)
+        values = np.frombuffer(reply, dtype=np.float32, offset=logits.nbytes, count=n)
+        return logits.reshape(n, move_encoding.ACTION_SIZE), values
+
+    def models(self):
+        return json.loads(self._call(OP_MODELS))
+
+    def stats(self):
+        return json.loads(self._call(OP_STATS))
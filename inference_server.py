@@ -0,0 +1,297 @@
+import argparse
+import json
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+from collections import Counter, deque
+
+import numpy as np
+
+import obs_encoding
+import policy
+from inference_client import (DEFAULT_ADDRESS, OP_EVALUATE, OP_MODELS, OP_STATS, POSITION_BYTES, REPLY,
+                              REQUEST, STATUS_ERROR, STATUS_OK, RemotePolicy, parse_address, recv_exact,
+                              unpack_obs)
+
+
+class _Request:
+    __slots__ = ("payload", "positions", "received", "reply", "done")
+
+    def __init__(self, payload, positions):
+        self.payload = payload
+        self.positions = positions
+        self.received = time.perf_counter()
+        self.reply = None
+        self.done = threading.Event()
+
+
+class _Batcher:
+    # Collects requests for one model and evaluates them in one forward pass.
+    # After the first request it waits up to window seconds for more, unless
+    # every connected client is already in the batch.
+    def __init__(self, server, name, model, window, max_batch):
+        self.server = server
+        self.name = name
+        self.model = model
+        self.window = window
+        self.max_batch = max_batch
+        self.queue = queue.Queue()
+        self._obs = np.empty((max_batch,) + obs_encoding.OBS_SHAPE, dtype=np.float32)
+        self.thread = threading.Thread(target=self._run, name=f"batcher-{name}", daemon=True)
+        self.thread.start()
+
+    def _collect(self):
+        first = self.queue.get()
+        if first is None:
+            return None
+        batch, positions = [first], first.positions
+        deadline = time.perf_counter() + self.window
+        while positions < self.max_batch and len(batch) < self.server.connections:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                request = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is None:
+                self.queue.put(None)
+                break
+            batch.append(request)
+            positions += request.positions
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            positions = sum(request.positions for request in batch)
+            obs = self._obs if positions <= len(self._obs) else np.empty(
+                (positions,) + obs_encoding.OBS_SHAPE, dtype=np.float32)
+            start = 0
+            for request in batch:
+                unpack_obs(request.payload, obs[start:start + request.positions])
+                start += request.positions
+            try:
+                logits, values = policy.policy_evaluate(self.model, obs[:positions])
+                logits = np.asarray(logits, dtype=np.float32)
+                values = np.asarray(values, dtype=np.float32)
+            except Exception as exc:
+                for request in batch:
+                    request.reply = (STATUS_ERROR, f"{self.name}: {exc}".encode())
+                    request.done.set()
+                continue
+            start = 0
+            for request in batch:
+                stop = start + request.positions
+                request.reply = (STATUS_OK, logits[start:stop].tobytes() + values[start:stop].tobytes())
+                start = stop
+                request.done.set()
+            self.server.stats.record_batch(positions)
+
+
+class ServerStats:
+    def __init__(self, window=10_000):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)
+        self.batch_sizes = Counter()
+        self.requests = Counter()
+        self.positions = 0
+        self.batches = 0
+        self.queued = 0
+        self.max_queued = 0
+        self.started = time.time()
+
+    def enqueue(self):
+        with self._lock:
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
+
+    def finish(self, name, received):
+        with self._lock:
+            self.queued -= 1
+            self.requests[name] += 1
+            self._latencies.append(time.perf_counter() - received)
+
+    def record_batch(self, positions):
+        with self._lock:
+            self.batches += 1
+            self.positions += positions
+            # Histogram of positions per forward pass, in power-of-two buckets
+            self.batch_sizes[1 << (positions.bit_length() - 1)] += 1
+
+    def snapshot(self, connections):
+        with self._lock:
+            latencies = np.array(self._latencies) * 1e3
+            return {
+                "uptime": time.time() - self.started,
+                "connections": connections,
+                "queue_depth": self.queued,
+                "max_queue_depth": self.max_queued,
+                "requests": dict(self.requests),
+                "positions": self.positions,
+                "batches": self.batches,
+                "mean_batch": self.positions / self.batches if self.batches else 0.0,
+                "batch_sizes": {str(size): count for size, count in sorted(self.batch_sizes.items())},
+                "latency_ms": {
+                    "p50": float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+                    "p99": float(np.percentile(latencies, 99)) if len(latencies) else 0.0,
+                },
+            }
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def setup(self):
+        if self.server.address_family == socket.AF_INET:
+            self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self.server.lock:
+            self.server.connections += 1
+
+    def finish(self):
+        with self.server.lock:
+            self.server.connections -= 1
+
+    def reply(self, status, payload):
+        self.request.sendall(REPLY.pack(status, len(payload)) + payload)
+
+    def handle(self):
+        try:
+            while True:
+                self._serve_one()
+        except ConnectionError:
+            pass  # client went away
+
+    def _serve_one(self):
+        op, name_size, positions = REQUEST.unpack(recv_exact(self.request, REQUEST.size))
+        name = recv_exact(self.request, name_size).decode()
+        payload = recv_exact(self.request, positions * POSITION_BYTES) if op == OP_EVALUATE else b""
+        if op == OP_STATS:
+            self.reply(STATUS_OK, json.dumps(self.server.snapshot()).encode())
+        elif op == OP_MODELS:
+            self.reply(STATUS_OK, json.dumps(sorted(self.server.batchers)).encode())
+        elif op != OP_EVALUATE:
+            self.reply(STATUS_ERROR, f"unknown request {op}".encode())
+        elif name not in self.server.batchers:
+            self.reply(STATUS_ERROR, f"unknown model {name!r}".encode())
+        else:
+            request = _Request(payload, positions)
+            self.server.stats.enqueue()
+            self.server.batchers[name].queue.put(request)
+            request.done.wait()
+            self.server.stats.finish(name, request.received)
+            self.reply(*request.reply)
+
+
+class InferenceServer(socketserver.ThreadingMixIn, socketserver.BaseServer):
+    # Holds each checkpoint once and serves RemotePolicy clients over a Unix
+    # socket or localhost TCP. Every connection gets a thread; evaluation
+    # happens on one batcher thread per model.
+    daemon_threads = True
+
+    def __init__(self, models, address=DEFAULT_ADDRESS, window=0.002, max_batch=256):
+        self.address_family, target = parse_address(address)
+        if self.address_family == socket.AF_UNIX and os.path.exists(target):
+            try:
+                RemotePolicy(address, "").connect().close()
+            except OSError:
+                os.unlink(target)  # left behind by a server that died
+            else:
+                raise OSError(f"an inference server is already listening on {address}")
+        super().__init__(target, _Handler)
+        self.socket = socket.socket(self.address_family, socket.SOCK_STREAM)
+        if self.address_family == socket.AF_INET:
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            self.socket.bind(target)
+            self.socket.listen(64)
+        except OSError:
+            self.socket.close()
+            raise
+        self.address = address
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.stats = ServerStats()
+        self.batchers = {name: _Batcher(self, name, model, window, max_batch) for name, model in models.items()}
+
+    def fileno(self):
+        return self.socket.fileno()
+
+    def get_request(self):
+        return self.socket.accept()
+
+    def shutdown_request(self, request):
+        try:
+            request.shutdown(socket.SHUT_WR)
+        except OSError:
+            pass
+        request.close()
+
+    def snapshot(self):
+        return self.stats.snapshot(self.connections)
+
+    def server_close(self):
+        for batcher in self.batchers.values():
+            batcher.queue.put(None)
+        self.socket.close()
+        if self.address_family == socket.AF_UNIX:
+            try:
+                os.unlink(self.server_address)
+            except OSError:
+                pass
+
+
+def format_stats(stats):
+    latency = stats["latency_ms"]
+    histogram = " ".join(f"{size}:{count}" for size, count in stats["batch_sizes"].items())
+    return (f"{stats['connections']} clients, queue {stats['queue_depth']} (max {stats['max_queue_depth']}), "
+            f"{sum(stats['requests'].values())} requests, {stats['batches']} batches "
+            f"(mean {stats['mean_batch']:.1f} positions), p50 {latency['p50']:.2f} ms, "
+            f"p99 {latency['p99']:.2f} ms\n  batch sizes {histogram or '-'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve policy checkpoints to GUI and CLI clients")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve_parser = sub.add_parser("serve", help="load checkpoints and serve them")
+    serve_parser.add_argument("models", nargs="*",
+                              help="checkpoint paths without extension (default: chess_agent/ppo_*)")
+    serve_parser.add_argument("--address", default=DEFAULT_ADDRESS, help="socket path or host:port")
+    serve_parser.add_argument("--window-ms", type=float, default=2.0, help="how long a batch waits for more requests")
+    serve_parser.add_argument("--max-batch", type=int, default=256, help="positions per forward pass")
+    serve_parser.add_argument("--report-every", type=float, default=0, help="print stats every N seconds")
+    stats_parser = sub.add_parser("stats", help="print the stats of a running server")
+    stats_parser.add_argument("--address", default=DEFAULT_ADDRESS)
+    args = parser.parse_args()
+
+    if args.command == "stats":
+        client = RemotePolicy(args.address, "")
+        print(f"models: {', '.join(client.models())}")
+        print(format_stats(client.stats()))
+        raise SystemExit
+
+    paths = args.models or [
+        f"chess_agent/ppo_{d}" for d in ["easy", "medium", "hard", "pro"]
+        if os.path.exists(f"chess_agent/ppo_{d}.npz") or os.path.exists(f"chess_agent/ppo_{d}.zip")
+    ]
+    if not paths:
+        parser.error("no checkpoints to serve")
+    models = {os.path.basename(path): policy.load_policy(path) for path in paths}
+    server = InferenceServer(models, args.address, args.window_ms / 1000, args.max_batch)
+    print(f"Serving {', '.join(models)} on {args.address}")
+    if args.report_every:
+        def report():
+            while True:
+                time.sleep(args.report_every)
+                print(format_stats(server.snapshot()), flush=True)
+        threading.Thread(target=report, daemon=True).start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(format_stats(server.snapshot()))
@@ -1,9 +1,16 @@
+import os
+
 import chess
-from chess_env import ChessEnv
-from stable_baselines3 import PPO
+import policy
+from obs_encoding import BoardObserver
+from opening_book import BOOK_PLIES, load_book
+from prediction_cache import PredictionCache
 
-env = ChessEnv()
-model = PPO.load("ppo_chess")
+book = load_book("chess_agent/book.bin")
+observer = BoardObserver()
+cache = PredictionCache()
+# Set CHESS_INFERENCE_SERVER to use a running inference_server.py
+model = policy.load_policy("ppo_chess", server=os.environ.get("CHESS_INFERENCE_SERVER"))
 
 board = chess.Board()
 
@@ -12,9 +19,9 @@ while not board.is_game_over():
 
     if board.turn == chess.WHITE:
         # حرکت عامل
-        obs, _ = env.reset()
-        action, _ = model.predict(obs, deterministic=True)
-        move = list(board.legal_moves)[action % len(list(board.legal_moves))]
+        move = book.choose(board, BOOK_PLIES["hard"]) if book else None
+        if move is None:
+            move = policy.predict_move(model, board, observer, cache)
         board.push(move)
         print(f"🤖 Agent plays: {move}")
     else:
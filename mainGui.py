@@ -1,26 +1,48 @@
 import pygame
 import chess
-import numpy as np
-from chess_env import ChessEnv
-from stable_baselines3 import PPO
-from stable_baselines3.common.vec_env import DummyVecEnv
+import importlib
 import os
 import sys
-import random
-import imageio
-
-frames = []
-
-# Initialize pygame
-pygame.init()
-pygame.mixer.init()
+import zlib
+from asset_cache import assets, file_stamp
+from render_cache import get_font, highlight_overlay, render_text
+from profiler import profiler
+from animation import Animator, Slide
+
+# Initialize pygame; the mixer and the game modules (numpy policy, env,
+# video encoder) load later so the menu shows up first. Processes spawned
+# from the game (the Pro learner) re-import this file as __mp_main__ and
+# must not open a window.
+GUI_PROCESS = __name__ != "__mp_main__"
+if GUI_PROCESS:
+    pygame.display.init()
+    pygame.font.init()
 
 # Constants
 WIDTH, HEIGHT = 640, 640
 SQUARE_SIZE = WIDTH // 8
 FPS = 30
+IDLE_WAIT = True
+MOVE_ANIMATION_MS = 330
+SEARCH_TIME_LIMIT = 5.0  # most seconds per agent move; less when the turn clock runs low
+PREDICTION_CACHE_ON_DISK = True
+OPENING_BOOK_PATH = "chess_agent/book.bin"  # built by opening_book.py; skipped when missing
+# Address of a running inference_server.py to share models with other players
+# (e.g. inference_client.DEFAULT_ADDRESS); falls back to local models if unset
+# or unreachable. Pro always runs locally since it keeps learning.
+INFERENCE_SERVER = os.environ.get("CHESS_INFERENCE_SERVER")
+
+# Performance HUD (toggle in game with F3) and Chrome trace output
+PROFILE_HUD = False
+PROFILE_TRACE_PATH = None  # e.g. "trace.json"; open in chrome://tracing or Perfetto
 PANEL_WIDTH = 160
 
+# Gameplay recording
+RECORD_GAMEPLAY = True
+RECORD_PATH = "gameplay.mp4"
+RECORD_FRAME_SKIP = 1
+RECORD_ONLY_ON_CHANGE = False
+
 # Colors
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
@@ -32,21 +54,25 @@ HIGHLIGHT_GREEN = (144, 238, 144, 120)
 HIGHLIGHT_RED = (255, 0, 0, 120)
 
 # Create screen
-screen = pygame.display.set_mode((WIDTH + PANEL_WIDTH, HEIGHT))
-pygame.display.set_caption("Chess")
+if GUI_PROCESS:
+    screen = pygame.display.set_mode((WIDTH + PANEL_WIDTH, HEIGHT))
+    pygame.display.set_caption("Chess")
 
 # Load sounds
+SOUND_FILES = {
+    'move': 'sounds/move.wav',
+    'capture': 'sounds/capture.wav',
+    'win': 'sounds/win.wav',
+    'loss': 'sounds/loss.wav',
+    'draw': 'sounds/draw.wav',
+    'click': 'sounds/click.wav'
+}
+
 def load_sounds():
+    if not pygame.mixer.get_init():
+        pygame.mixer.init()
     sounds = {}
-    sound_files = {
-        'move': 'sounds/move.wav',
-        'capture': 'sounds/capture.wav',
-        'win': 'sounds/win.wav',
-        'loss': 'sounds/loss.wav',
-        'draw': 'sounds/draw.wav',
-        'click': 'sounds/click.wav'
-    }
-    for name, path in sound_files.items():
+    for name, path in SOUND_FILES.items():
         if os.path.exists(path):
             sounds[name] = pygame.mixer.Sound(path)
         else:
@@ -70,6 +96,9 @@ def load_piece_images(theme="classic"):
                 pieces[name] = surf
     return pieces
 
+def piece_image_paths(theme):
+    return [f"assets/{theme}/{color}{piece}.png" for color in ['w', 'b'] for piece in ['p', 'n', 'b', 'r', 'q', 'k']]
+
 # Load backgrounds - only specific ones
 def load_backgrounds():
     backgrounds = {}
@@ -85,7 +114,89 @@ def load_backgrounds():
                 )
     return backgrounds
 
+# Cached loaders: reused across games until a backing file changes
+MODEL_PATHS = {
+    "easy": "chess_agent/ppo_easy",
+    "medium": "chess_agent/ppo_medium",
+    "hard": "chess_agent/ppo_hard",
+    "pro": "chess_agent/ppo_pro"
+}
+
+def get_piece_images(theme):
+    return assets.get(("pieces", theme), lambda: load_piece_images(theme), piece_image_paths(theme))
+
+def get_sounds():
+    return assets.get("sounds", load_sounds, SOUND_FILES.values())
+
+def get_backgrounds():
+    return assets.get("backgrounds", load_backgrounds)
+
+def get_env():
+    from stable_baselines3.common.vec_env import DummyVecEnv
+    from chess_env import ChessEnv
+    return assets.get("env", lambda: DummyVecEnv([lambda: ChessEnv()]))
+
+def get_model(difficulty):
+    model_path = MODEL_PATHS[difficulty]
+
+    def load():
+        if difficulty == "pro":
+            # Pro keeps learning, so it always needs the full SB3 model
+            from stable_baselines3 import PPO
+            env = get_env()
+            try:
+                return PPO.load(model_path, env=env)
+            except:
+                return PPO("MlpPolicy", env, verbose=0)
+        import policy
+        return policy.load_policy(model_path, server=INFERENCE_SERVER)
+
+    return assets.get(("model", difficulty), load, [model_path + ".zip", model_path + ".npz"])
+
+def get_prediction_cache(difficulty):
+    # One cache per loaded model, kept on disk next to the fixed checkpoints.
+    # Pro's weights keep changing, so its cache lives in memory only.
+    from prediction_cache import PredictionCache
+    model_path = MODEL_PATHS[difficulty]
+    paths = [model_path + ".zip", model_path + ".npz"]
+
+    def load():
+        if difficulty == "pro" or not PREDICTION_CACHE_ON_DISK:
+            return PredictionCache()
+        fingerprint = zlib.crc32(repr(file_stamp(paths)).encode())
+        try:
+            return PredictionCache(path=model_path + ".cache", fingerprint=fingerprint)
+        except OSError:
+            return PredictionCache()
+
+    return assets.get(("predictions", difficulty), load, paths)
+
+def get_pro_learner():
+    # One learner for the session, so Pro's rollouts fill up across games
+    from pro_learner import ProLearner
+    return assets.get("learner", lambda: ProLearner(MODEL_PATHS["pro"]))
+
+def get_opening_book():
+    from opening_book import load_book
+    return assets.get("book", lambda: load_book(OPENING_BOOK_PATH), [OPENING_BOOK_PATH])
+
+GAME_MODULES = ["move_encoding", "obs_encoding", "policy", "agent_worker", "search", "prediction_cache", "opening_book"]
+if RECORD_GAMEPLAY:
+    GAME_MODULES.append("recorder")
+
+def preload_assets():
+    # Warm the cache in the background while the menus are showing
+    futures = [assets.preload(importlib.import_module, name) for name in GAME_MODULES]
+    futures.append(assets.preload(get_backgrounds))
+    futures.extend(assets.preload(get_piece_images, theme) for theme in ["classic", "wood", "glass"])
+    futures.append(assets.preload(get_sounds))
+    futures.append(assets.preload(get_opening_book))
+    # Pro needs torch and Stable-Baselines3, so it loads only when picked
+    futures.extend(assets.preload(get_model, difficulty) for difficulty in MODEL_PATHS if difficulty != "pro")
+    return futures
+
 # Draw board
+@profiler.timed("board")
 def draw_board(screen, board, images, selected=None, legal_moves=[], last_move=None, background=None, skip_square=None):
     if background:
         screen.blit(background, (0, 0))
@@ -106,9 +217,7 @@ def draw_board(screen, board, images, selected=None, legal_moves=[], last_move=N
             elif last_move and (square == last_move.from_square or square == last_move.to_square):
                 overlay = HIGHLIGHT_RED
             if overlay:
-                surface = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE), pygame.SRCALPHA)
-                surface.fill(overlay)
-                screen.blit(surface, (file * SQUARE_SIZE, rank * SQUARE_SIZE))
+                screen.blit(highlight_overlay(overlay, (SQUARE_SIZE, SQUARE_SIZE)), (file * SQUARE_SIZE, rank * SQUARE_SIZE))
     for rank in range(8):
         for file in range(8):
             square = chess.square(file, 7 - rank)
@@ -119,30 +228,136 @@ def draw_board(screen, board, images, selected=None, legal_moves=[], last_move=N
                 img_key = ('w' if piece.color == chess.WHITE else 'b') + piece.symbol().lower()
                 screen.blit(images[img_key], pygame.Rect(file * SQUARE_SIZE, rank * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
 
-# Animate piece movement (remove origin piece first)
-def animate_piece_move(screen, board, images, move, background):
-    start_file = chess.square_file(move.from_square)
-    start_rank = 7 - chess.square_rank(move.from_square)
-    end_file = chess.square_file(move.to_square)
-    end_rank = 7 - chess.square_rank(move.to_square)
-    dx = (end_file - start_file) * SQUARE_SIZE
-    dy = (end_rank - start_rank) * SQUARE_SIZE
-    piece = board.piece_at(move.from_square)
-    if not piece:
-        return
-    img_key = ('w' if piece.color == chess.WHITE else 'b') + piece.symbol().lower()
-    piece_image = images[img_key]
-    frames = 10
-    clock = pygame.time.Clock()
-    for i in range(1, frames + 1):
-        screen.fill((30, 30, 30))
-        board_surface = screen.subsurface((0, 0, WIDTH, HEIGHT))
-        draw_board(board_surface, board, images, background=background, skip_square=move.from_square)
-        x = start_file * SQUARE_SIZE + dx * (i / frames)
-        y = start_rank * SQUARE_SIZE + dy * (i / frames)
-        board_surface.blit(piece_image, (x, y))
-        pygame.display.flip()
-        clock.tick(FPS)
+# Retained-mode board: only squares whose contents changed are redrawn.
+# Moving pieces are drawn on top; the squares under last frame's sprites are
+# restored from the cached base layer before the next ones are drawn.
+class BoardRenderer:
+    def __init__(self, screen, images, background=None):
+        self.screen = screen
+        self.images = images
+        self.base = pygame.Surface((WIDTH, HEIGHT))
+        draw_board(self.base, chess.Board(None), images, background=background)
+        self.squares = [None] * 64
+        self.last_key = None
+        self.sprite_rects = []
+        self.dirty = []
+
+    def invalidate(self):
+        self.squares = [None] * 64
+        self.last_key = None
+
+    def _forget(self, rect):
+        rect = rect.clip(self.base.get_rect())
+        for file in range(rect.left // SQUARE_SIZE, (rect.right - 1) // SQUARE_SIZE + 1):
+            for row in range(rect.top // SQUARE_SIZE, (rect.bottom - 1) // SQUARE_SIZE + 1):
+                self.squares[chess.square(file, 7 - row)] = None
+
+    @profiler.timed("draw")
+    def draw(self, board, selected=None, legal_moves=(), last_move=None, hidden=(), sprites=()):
+        key = (board.board_fen(), selected, tuple(legal_moves), last_move, tuple(hidden))
+        if key == self.last_key and not sprites and not self.sprite_rects:
+            return
+        self.last_key = key
+        for rect in self.sprite_rects:
+            self._forget(rect)
+        for square in chess.SQUARES:
+            overlay = None
+            if selected == square:
+                overlay = HIGHLIGHT_YELLOW
+            elif square in legal_moves:
+                overlay = HIGHLIGHT_GREEN
+            elif last_move and (square == last_move.from_square or square == last_move.to_square):
+                overlay = HIGHLIGHT_RED
+            piece = None if square in hidden else board.piece_at(square)
+            state = (piece, overlay)
+            if self.squares[square] == state:
+                continue
+            self.squares[square] = state
+            rect = pygame.Rect(chess.square_file(square) * SQUARE_SIZE, (7 - chess.square_rank(square)) * SQUARE_SIZE,
+                               SQUARE_SIZE, SQUARE_SIZE)
+            self.screen.blit(self.base, rect, rect)
+            if overlay:
+                self.screen.blit(highlight_overlay(overlay, (SQUARE_SIZE, SQUARE_SIZE)), rect)
+            if piece:
+                img_key = ('w' if piece.color == chess.WHITE else 'b') + piece.symbol().lower()
+                self.screen.blit(self.images[img_key], rect)
+            self.dirty.append(rect)
+        for rect in self.sprite_rects:
+            self.dirty.append(rect)
+        self.sprite_rects = []
+        for image, pos in sprites:
+            rect = self.screen.blit(image, pos)
+            self.sprite_rects.append(rect)
+            self.dirty.append(rect)
+
+    def take_dirty(self):
+        dirty, self.dirty = self.dirty, []
+        return dirty
+
+# Retained-mode side panel: buttons are drawn once, text slots on change
+class PanelRenderer:
+    def __init__(self, screen, buttons, color=(60, 60, 60)):
+        self.screen = screen
+        self.buttons = buttons
+        self.color = color
+        self.rect = pygame.Rect(WIDTH, 0, PANEL_WIDTH, HEIGHT)
+        self.texts = {}
+        self.full = True
+        self.dirty = []
+
+    def invalidate(self):
+        self.full = True
+
+    def begin(self):
+        if not self.full:
+            return
+        self.full = False
+        self.texts.clear()
+        pygame.draw.rect(self.screen, self.color, self.rect)
+        for rect, label in self.buttons:
+            pygame.draw.rect(self.screen, (100, 100, 100), rect.inflate(20, 10))
+            self.screen.blit(label, rect)
+        self.dirty.append(self.rect)
+
+    def text(self, slot, text, font, pos, centered=False):
+        old = self.texts.get(slot)
+        if old and old[0] == text:
+            return
+        label = render_text(font, text, WHITE)
+        x, y = pos
+        if centered:
+            x -= label.get_width() // 2
+        rect = label.get_rect(topleft=(x, y))
+        if old:
+            self.screen.fill(self.color, old[1])
+            self.dirty.append(old[1])
+        self.screen.blit(label, rect)
+        self.dirty.append(rect)
+        self.texts[slot] = (text, rect)
+
+    def take_dirty(self):
+        dirty, self.dirty = self.dirty, []
+        return dirty
+
+# Slides for a move that is about to be pushed: the piece, and the rook
+# too when castling. The board hides their destination squares meanwhile.
+def move_slides(board, move, images, start_time):
+    def corner(square):
+        return chess.square_file(square) * SQUARE_SIZE, (7 - chess.square_rank(square)) * SQUARE_SIZE
+
+    def slide(from_square, to_square):
+        piece = board.piece_at(from_square)
+        img_key = ('w' if piece.color == chess.WHITE else 'b') + piece.symbol().lower()
+        return Slide(images[img_key], corner(from_square), corner(to_square), to_square, start_time, MOVE_ANIMATION_MS)
+
+    if not board.piece_at(move.from_square):
+        return []
+    slides = [slide(move.from_square, move.to_square)]
+    if board.is_castling(move):
+        rank = chess.square_rank(move.from_square)
+        kingside = board.is_kingside_castling(move)
+        slides.append(slide(chess.square(7 if kingside else 0, rank), chess.square(5 if kingside else 3, rank)))
+    return slides
 
 def get_square_from_mouse(pos):
     x, y = pos
@@ -151,65 +366,66 @@ def get_square_from_mouse(pos):
     return chess.square(x // SQUARE_SIZE, 7 - (y // SQUARE_SIZE))
 
 def choose_promotion(screen, images, color):
-    font = pygame.font.SysFont(None, 36)
+    font = get_font(36)
     pieces = ['q', 'r', 'b', 'n']
     piece_names = {'q': 'Queen', 'r': 'Rook', 'b': 'Bishop', 'n': 'Knight'}
     selected = 0
     while True:
         screen.fill(DARK_GRAY)
-        title = font.render("Choose Promotion Piece", True, WHITE)
+        title = render_text(font, "Choose Promotion Piece", WHITE)
         screen.blit(title, (WIDTH // 2 - title.get_width() // 2, 50))
         for i, p in enumerate(pieces):
             img_key = ('w' if color == chess.WHITE else 'b') + p
             img = images[img_key]
             rect = img.get_rect(center=(100 + i * 150, HEIGHT // 2))
             screen.blit(img, rect)
-            name_text = font.render(piece_names[p], True, WHITE)
+            name_text = render_text(font, piece_names[p], WHITE)
             screen.blit(name_text, (rect.centerx - name_text.get_width() // 2, rect.bottom + 10))
             if i == selected:
                 pygame.draw.rect(screen, WHITE, rect.inflate(20, 20), 3)
         pygame.display.flip()
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_LEFT:
-                    selected = (selected - 1) % len(pieces)
-                elif event.key == pygame.K_RIGHT:
-                    selected = (selected + 1) % len(pieces)
-                elif event.key == pygame.K_RETURN:
-                    return {'q': chess.QUEEN, 'r': chess.ROOK, 'b': chess.BISHOP, 'n': chess.KNIGHT}[pieces[selected]]
+        # Nothing changes until a key is pressed, so sleep until one arrives
+        event = pygame.event.wait()
+        if event.type == pygame.QUIT:
+            pygame.quit()
+            sys.exit()
+        elif event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_LEFT:
+                selected = (selected - 1) % len(pieces)
+            elif event.key == pygame.K_RIGHT:
+                selected = (selected + 1) % len(pieces)
+            elif event.key == pygame.K_RETURN:
+                return {'q': chess.QUEEN, 'r': chess.ROOK, 'b': chess.BISHOP, 'n': chess.KNIGHT}[pieces[selected]]
 
 def show_settings(screen, backgrounds):
-    font = pygame.font.SysFont(None, 40)
+    font = get_font(40)
     themes = ["classic", "wood", "glass"]
     bg_names = list(backgrounds.keys()) if backgrounds else ["None"]
     selected_theme = "classic"
     selected_bg = "None"
     while True:
         screen.fill(DARK_GRAY)
-        title = font.render("Theme & Background", True, WHITE)
+        title = render_text(font, "Theme & Background", WHITE)
         screen.blit(title, (WIDTH // 2 - title.get_width() // 2, 30))
-        theme_title = font.render("Pieces", True, LIGHT_GRAY)
+        theme_title = render_text(font, "Pieces", LIGHT_GRAY)
         screen.blit(theme_title, (50, 100))
         for i, theme in enumerate(themes):
             color = WHITE if theme == selected_theme else LIGHT_GRAY
-            label = font.render(theme.capitalize(), True, color)
+            label = render_text(font, theme.capitalize(), color)
             rect = label.get_rect(topleft=(100 + i * 150, 150))
             screen.blit(label, rect)
             if theme == selected_theme:
                 pygame.draw.rect(screen, WHITE, rect.inflate(20, 10), 2)
-        bg_title = font.render("Background", True, LIGHT_GRAY)
+        bg_title = render_text(font, "Background", LIGHT_GRAY)
         screen.blit(bg_title, (50, 220))
         for i, bg in enumerate(bg_names):
             color = WHITE if bg == selected_bg else LIGHT_GRAY
-            label = font.render(bg.capitalize(), True, color)
+            label = render_text(font, bg.capitalize(), color)
             rect = label.get_rect(topleft=(100 + i * 150, 270))
             screen.blit(label, rect)
             if bg == selected_bg:
                 pygame.draw.rect(screen, WHITE, rect.inflate(20, 10), 2)
-        ok_label = font.render("Ok", True, WHITE)
+        ok_label = render_text(font, "Ok", WHITE)
         ok_rect = ok_label.get_rect(center=(WIDTH // 2, HEIGHT - 100))
         screen.blit(ok_label, ok_rect)
         pygame.draw.rect(screen, LIGHT_GRAY, ok_rect.inflate(20, 10), 2)
@@ -230,14 +446,14 @@ def show_settings(screen, backgrounds):
                     return selected_theme, selected_bg if selected_bg != "None" else None
 
 def show_play_menu(screen):
-    font = pygame.font.SysFont(None, 48)
+    font = get_font(48)
     options = ["Easy", "Medium", "Hard", "Pro"]
     while True:
         screen.fill((20, 20, 20))
-        title = font.render("Choose level", True, WHITE)
+        title = render_text(font, "Choose level", WHITE)
         screen.blit(title, (WIDTH // 2 - title.get_width() // 2, 50))
         for i, text in enumerate(options):
-            label = font.render(text, True, WHITE)
+            label = render_text(font, text, WHITE)
             rect = label.get_rect(center=(WIDTH // 2, 150 + i * 80))
             screen.blit(label, rect)
             pygame.draw.rect(screen, LIGHT_GRAY, rect, 2)
@@ -253,14 +469,14 @@ def show_play_menu(screen):
                         return options[i].lower()
 
 def show_color_selection(screen):
-    font = pygame.font.SysFont(None, 48)
+    font = get_font(48)
     options = ["White", "Black"]
     while True:
         screen.fill((25, 25, 25))
-        title = font.render("Select side", True, WHITE)
+        title = render_text(font, "Select side", WHITE)
         screen.blit(title, (WIDTH // 2 - title.get_width() // 2, 50))
         for i, text in enumerate(options):
-            label = font.render(text, True, WHITE)
+            label = render_text(font, text, WHITE)
             rect = label.get_rect(center=(WIDTH // 2, 150 + i * 100))
             screen.blit(label, rect)
             pygame.draw.rect(screen, LIGHT_GRAY, rect, 2)
@@ -275,15 +491,15 @@ def show_color_selection(screen):
                     if 120 + i * 100 < y < 180 + i * 100:
                         return "white" if i == 0 else "black"
 
-def show_main_menu(screen, backgrounds):
-    font = pygame.font.SysFont(None, 48)
+def show_main_menu(screen):
+    font = get_font(48)
     options = ["Play", "Settings"]
     selected_theme = "classic"
     selected_background = None
     while True:
         screen.fill((30, 30, 30))
         for i, text in enumerate(options):
-            label = font.render(text, True, WHITE)
+            label = render_text(font, text, WHITE)
             rect = label.get_rect(center=(WIDTH // 2, 200 + i * 100))
             screen.blit(label, rect)
             pygame.draw.rect(screen, LIGHT_GRAY, rect, 2)
@@ -297,175 +513,245 @@ def show_main_menu(screen, backgrounds):
                 for i in range(len(options)):
                     if 180 + i * 100 < y < 240 + i * 100:
                         if options[i] == "Settings":
+                            backgrounds = get_backgrounds()
                             selected_theme, bg_name = show_settings(screen, backgrounds)
                             selected_background = backgrounds.get(bg_name) if bg_name in backgrounds else None
                         else:
                             difficulty = show_play_menu(screen)
                             return difficulty, selected_theme, selected_background
 
-def move_to_san(board, move):
-    return board.san(move)
-
 def show_game_result(screen, result):
-    font_large = pygame.font.SysFont(None, 48)
-    font_small = pygame.font.SysFont(None, 36)
-    overlay = pygame.Surface((WIDTH + PANEL_WIDTH, HEIGHT), pygame.SRCALPHA)
-    overlay.fill((0, 0, 0, 200))
-    screen.blit(overlay, (0, 0))
+    font_large = get_font(48)
+    font_small = get_font(36)
+    screen.blit(highlight_overlay((0, 0, 0, 200), (WIDTH + PANEL_WIDTH, HEIGHT)), (0, 0))
     if result == "1-0":
         message = "White is winner!"
     elif result == "0-1":
         message = "Black is winner!"
     else:
         message = "Draw"
-    result_text = font_large.render(message, True, WHITE)
+    result_text = render_text(font_large, message, WHITE)
     screen.blit(result_text, (WIDTH // 2 - result_text.get_width() // 2, HEIGHT // 2 - 50))
-    continue_text = font_small.render("Continue", True, WHITE)
+    continue_text = render_text(font_small, "Continue", WHITE)
     continue_rect = continue_text.get_rect(center=(WIDTH // 2, HEIGHT // 2 + 50))
     pygame.draw.rect(screen, LIGHT_GRAY, continue_rect.inflate(20, 10))
     screen.blit(continue_text, continue_rect)
     pygame.display.flip()
     while True:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-            elif event.type == pygame.MOUSEBUTTONDOWN:
-                if continue_rect.inflate(20, 10).collidepoint(event.pos):
-                    return
+        event = pygame.event.wait()
+        if event.type == pygame.QUIT:
+            pygame.quit()
+            sys.exit()
+        elif event.type == pygame.MOUSEBUTTONDOWN:
+            if continue_rect.inflate(20, 10).collidepoint(event.pos):
+                return
+
 
 
+def run_game(difficulty, theme, player_color, background=None, recorder=None):
+    # Usually already imported by preload_assets while the menus were up
+    import move_encoding
+    import obs_encoding
+    import policy
+    from agent_worker import PENDING, AgentWorker
+    from search import SEARCH_NODES, PolicySearch
+    from opening_book import BOOK_PLIES
+    from game_state import GameState
 
-def run_game(difficulty, theme, player_color, background=None):
     screen = pygame.display.set_mode((WIDTH + PANEL_WIDTH, HEIGHT))
     pygame.display.set_caption("Chess")
     clock = pygame.time.Clock()
-    images = load_piece_images(theme)
-    sounds = load_sounds()
-    board = chess.Board()
+    images = get_piece_images(theme)
+    sounds = get_sounds()
+    state = GameState()
+    board = state.board
 
-    env = DummyVecEnv([lambda: ChessEnv()])
+    @profiler.timed("sound")
+    def play(name):
+        sounds[name].play()
 
-    model_path = {
-        "easy": "chess_agent/ppo_easy",
-        "medium": "chess_agent/ppo_medium",
-        "hard": "chess_agent/ppo_hard",
-        "pro": "chess_agent/ppo_pro"
-    }[difficulty]
+    model_path = MODEL_PATHS[difficulty]
 
-    if difficulty == "pro":
-        try:
-            model = PPO.load(model_path, env=env)
-        except:
-            model = PPO("MlpPolicy", env, verbose=0)
-    else:
-        try:
-            model = PPO.load(model_path)
-        except:
-            print(f"Could not load model from {model_path}")
-            return
+    try:
+        model = get_model(difficulty)
+    except:
+        print(f"Could not load model from {model_path}")
+        return
 
+    observer = obs_encoding.BoardObserver()
+    cache = get_prediction_cache(difficulty)
+    book = get_opening_book()
+    search = None
+    if SEARCH_NODES[difficulty]:
+        search = PolicySearch(model, nodes=SEARCH_NODES[difficulty], time_limit=SEARCH_TIME_LIMIT, cache=cache)
+
+    @profiler.timed("inference")
+    def select_agent_move(snapshot):
+        # Book moves skip inference entirely
+        move = book.choose(snapshot, BOOK_PLIES[difficulty]) if book else None
+        if move is not None:
+            return move
+        if search:
+            move = search.search(snapshot)
+            if move is not None:
+                return move
+        return policy.predict_move(model, snapshot, observer, cache)
+
+    agent = AgentWorker(select_agent_move, on_cancel=search.stop if search else None)
+    learner = get_pro_learner() if difficulty == "pro" else None
     agent_color = chess.WHITE if player_color == "black" else chess.BLACK
     selected_square = None
     legal_squares = []
     last_agent_move = None
-    move_history = []
-    undone_moves = []
     turn_start_time = pygame.time.get_ticks()
     turn_time_limit = 30000
 
-    font = pygame.font.SysFont(None, 32)
-    small_font = pygame.font.SysFont(None, 24)
+    font = get_font(32)
+    small_font = get_font(24)
 
-    back_label = font.render("Menu", True, (255, 255, 255))
+    back_label = render_text(font, "Menu", (255, 255, 255))
     back_rect = back_label.get_rect(center=(WIDTH + PANEL_WIDTH // 2, 50))
-    restart_label = font.render("Restart", True, (255, 255, 255))
+    restart_label = render_text(font, "Restart", (255, 255, 255))
     restart_rect = restart_label.get_rect(center=(WIDTH + PANEL_WIDTH // 2, 100))
-    undo_label = font.render("Undo", True, (255, 255, 255))
+    undo_label = render_text(font, "Undo", (255, 255, 255))
     undo_rect = undo_label.get_rect(center=(WIDTH + PANEL_WIDTH // 2, 150))
-    redo_label = font.render("Redo", True, (255, 255, 255))
+    redo_label = render_text(font, "Redo", (255, 255, 255))
     redo_rect = redo_label.get_rect(center=(WIDTH + PANEL_WIDTH // 2, 200))
 
+    renderer = BoardRenderer(screen, images, background)
+    panel = PanelRenderer(screen, [(back_rect, back_label), (restart_rect, restart_label),
+                                   (undo_rect, undo_label), (redo_rect, redo_label)])
+
+    animator = Animator()
+    sprites = []
+
     running = True
     game_over = False
+    show_hud = PROFILE_HUD
+    profiler.enabled = show_hud or profiler.trace_path is not None
+    profiler.reset()
+    hud_lines, hud_time = [], 0
 
     while running:
-        frame_str = pygame.image.tostring(screen, 'RGB')
-        frame_surf = pygame.image.fromstring(frame_str, (WIDTH + PANEL_WIDTH, HEIGHT), 'RGB')
-        frame_array = pygame.surfarray.array3d(frame_surf).swapaxes(0, 1)
-        frames.append(frame_array)
+        if recorder:
+            with profiler.stage("capture"):
+                recorder.capture(screen, (len(board.move_stack), board.move_stack[-1:], selected_square,
+                                          tuple(pos for _, pos in sprites)))
         current_time = pygame.time.get_ticks()
         time_left = max(0, turn_time_limit - (current_time - turn_start_time))
 
-        screen.fill((30, 30, 30))
-        board_surface = screen.subsurface((0, 0, WIDTH, HEIGHT))
-        draw_board(board_surface, board, images, selected_square, legal_squares, last_agent_move, background)
+        # Moves are pushed when they start animating, so the agent can think
+        # about the new position while the piece is still sliding
+        sprites = animator.update(current_time)
+        renderer.draw(board, selected_square, legal_squares, last_agent_move, animator.hidden(), sprites)
+        panel.begin()
 
-        pygame.draw.rect(screen, (60, 60, 60), (WIDTH, 0, PANEL_WIDTH, HEIGHT))
-        for rect, label in [(back_rect, back_label), (restart_rect, restart_label),
-                            (undo_rect, undo_label), (redo_rect, redo_label)]:
-            pygame.draw.rect(screen, (100, 100, 100), rect.inflate(20, 10))
-            screen.blit(label, rect)
-
-        turn_label = font.render(
-            "Your turn" if board.turn == (chess.WHITE if player_color == "white" else chess.BLACK) else "Bot Turn",
-            True, (255, 255, 255)
-        )
-        screen.blit(turn_label, (WIDTH + PANEL_WIDTH // 2 - turn_label.get_width() // 2, 250))
-        timer_label = font.render(f"Time: {time_left // 1000}s", True, (255, 255, 255))
-        screen.blit(timer_label, (WIDTH + PANEL_WIDTH // 2 - timer_label.get_width() // 2, 300))
-
-        screen.blit(small_font.render("Move History:", True, (255, 255, 255)), (WIDTH + 10, 350))
-        for i, move_text in enumerate(move_history[-10:]):
-            screen.blit(small_font.render(move_text, True, (255, 255, 255)), (WIDTH + 10, 380 + i * 20))
-
-        pygame.display.flip()
+        if board.turn == (chess.WHITE if player_color == "white" else chess.BLACK):
+            turn_text = "Your turn"
+        elif agent.thinking:
+            turn_text = "Thinking" + "." * (current_time // 300 % 4)
+        else:
+            turn_text = "Bot Turn"
+        panel.text("turn", turn_text, font, (WIDTH + PANEL_WIDTH // 2, 250), centered=True)
+        panel.text("timer", f"Time: {time_left // 1000}s", font, (WIDTH + PANEL_WIDTH // 2, 300), centered=True)
+        if search and search.stats:
+            search_text = f"{search.stats['simulations']} nodes, {search.stats['nodes_per_second']:.0f}/s"
+            panel.text("search", search_text, small_font, (WIDTH + PANEL_WIDTH // 2, 328), centered=True)
+
+        if show_hud:
+            # Refresh a few times a second so the HUD itself stays cheap
+            if current_time - hud_time >= 250:
+                hud_lines, hud_time = profiler.hud_lines(), current_time
+            panel.text("history", "Performance:", small_font, (WIDTH + 10, 350))
+            lines = hud_lines
+        else:
+            panel.text("history", "Move History:", small_font, (WIDTH + 10, 350))
+            lines = state.san_history()[-10:]
+        for i in range(10):
+            panel.text(("history", i), lines[i] if i < len(lines) else "", small_font, (WIDTH + 10, 380 + i * 20))
+
+        dirty = renderer.take_dirty() + panel.take_dirty()
+        if dirty:
+            with profiler.stage("update"):
+                pygame.display.update(dirty)
+        elif (IDLE_WAIT and not recorder and board.turn != agent_color
+              and not agent.thinking and not animator.active):
+            # Nothing to animate: sleep until input arrives or the timer ticks.
+            # Not while recording, which needs a frame on every FPS tick.
+            event = pygame.event.wait(time_left % 1000 or 1000)
+            if event.type != pygame.NOEVENT:
+                pygame.event.post(event)
         clock.tick(FPS)
+        profiler.frame()
 
-        if board.is_game_over() and not game_over:
+        if state.is_game_over() and not game_over and not animator.active:
             game_over = True
-            result = board.result()
+            result = state.result()
             if (result == "1-0" and player_color == "white") or (result == "0-1" and player_color == "black"):
-                sounds['win'].play()
+                play('win')
             elif result == "1/2-1/2":
-                sounds['draw'].play()
+                play('draw')
             else:
-                sounds['loss'].play()
+                play('loss')
+            agent.shutdown()
+            if learner:
+                agent_won = (result == "1-0") == (agent_color == chess.WHITE)
+                learner.finish(0 if result == "1/2-1/2" else (1 if agent_won else -1))
             show_game_result(screen, result)
             return
 
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
+                profiler.dump()
                 pygame.quit()
                 sys.exit()
 
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                show_hud = not show_hud
+                profiler.enabled = show_hud or profiler.trace_path is not None
+                hud_time = 0
+
             elif event.type == pygame.MOUSEBUTTONDOWN:
-                sounds['click'].play()
+                play('click')
 
                 if back_rect.collidepoint(event.pos):
+                    agent.shutdown()
+                    if learner:
+                        learner.discard()
                     return
                 elif restart_rect.collidepoint(event.pos):
-                    board.reset()
+                    agent.cancel()
+                    if learner:
+                        learner.discard()
+                    state.reset()
+                    animator.clear()
                     selected_square = None
                     legal_squares = []
                     last_agent_move = None
-                    move_history.clear()
-                    undone_moves.clear()
                     turn_start_time = pygame.time.get_ticks()
                     game_over = False
                     continue
                 elif undo_rect.collidepoint(event.pos):
-                    if len(board.move_stack) >= 1:
-                        undone_moves.append(board.pop())
-                        if len(board.move_stack) >= 1:
-                            undone_moves.append(board.pop())
-                        move_history = move_history[:-2] if len(move_history) >= 2 else []
+                    if state.ply >= 1:
+                        agent.cancel()
+                        animator.clear()
+                        undone = 0
+                        for _ in range(min(2, state.ply)):
+                            state.pop()
+                            undone += board.turn == agent_color
+                        if learner:
+                            learner.undo(undone)
                         turn_start_time = pygame.time.get_ticks()
                 elif redo_rect.collidepoint(event.pos):
-                    if undone_moves:
-                        board.push(undone_moves.pop())
-                        if undone_moves:
-                            board.push(undone_moves.pop())
+                    if state.can_redo():
+                        agent.cancel()
+                        animator.clear()
+                        for _ in range(2):
+                            move = state.redo_move()
+                            if learner and move and board.turn == agent_color:
+                                # Replayed agent moves count again, as Undo dropped them
+                                learner.record(obs_encoding.encode_board(board), move_encoding.encode(move))
+                            state.redo()
                         turn_start_time = pygame.time.get_ticks()
                 elif event.pos[0] < WIDTH:
                     square = get_square_from_mouse(event.pos)
@@ -474,47 +760,67 @@ def run_game(difficulty, theme, player_color, background=None):
                         if selected_square is None:
                             if piece and piece.color == (chess.WHITE if player_color == "white" else chess.BLACK):
                                 selected_square = square
-                                legal_squares = [m.to_square for m in board.legal_moves if m.from_square == square]
+                                legal_squares = state.targets(square)
                         else:
                             from_piece = board.piece_at(selected_square)
                             move = chess.Move(selected_square, square)
                             if from_piece and from_piece.piece_type == chess.PAWN and (chess.square_rank(square) in [0, 7]):
                                 promo_piece = choose_promotion(screen, images, board.turn)
+                                renderer.invalidate()
+                                panel.invalidate()
                                 move = chess.Move(selected_square, square, promotion=promo_piece)
-                            if move in board.legal_moves:
-                                sounds['capture' if board.is_capture(move) else 'move'].play()
-                                move_history.append(move_to_san(board, move))
-                                animate_piece_move(screen, board, images, move, background)
-                                board.push(move)
-                                undone_moves.clear()
+                            if state.is_legal(move):
+                                play('capture' if board.is_capture(move) else 'move')
+                                animator.start(move_slides(board, move, images, pygame.time.get_ticks()))
+                                state.push(move)
+                                turn_start_time = pygame.time.get_ticks()
                             selected_square = None
                             legal_squares = []
 
-        if not game_over and board.turn == agent_color and not board.is_game_over():
-            if time_left <= 0:
-                result = "0-1" if player_color == "white" else "1-0"
-                show_game_result(screen, result)
-                return
-            try:
-                obs = env.envs[0]._get_obs()
-                action, _ = model.predict(obs, deterministic=True)
-
-                move = env.envs[0].all_moves[action]
-                if move not in board.legal_moves:
-                    move = random.choice(list(board.legal_moves))
+        if learner and not agent.thinking:
+            # Cached priors and the search tree came from the old weights
+            if learner.sync(model):
+                cache.clear()
+                if search:
+                    search.reset()
+
+        # The clock limits the player's turn; the agent's thinking time,
+        # which now runs alongside the game loop, is never charged to it
+        if not game_over and board.turn != agent_color and not state.is_game_over() and time_left <= 0:
+            result = "0-1" if player_color == "white" else "1-0"
+            agent.shutdown()
+            if learner:
+                learner.finish(1)  # the agent wins on the player's timeout
+            show_game_result(screen, result)
+            return
 
-                sounds['capture' if board.is_capture(move) else 'move'].play()
-                move_history.append(move_to_san(board, move))
-                animate_piece_move(screen, board, images, move, background)
-                board.push(move)
+        if not game_over and board.turn == agent_color and not state.is_game_over():
+            if not agent.thinking:
+                if search:
+                    # What is left of the turn clock, less a second to play the
+                    # move, and never more than the fixed budget
+                    search.time_limit = max(0.0, min(SEARCH_TIME_LIMIT, time_left / 1000 - 1.0))
+                agent.submit(board)
+            try:
+                move = agent.poll(board)
+            except Exception as e:
+                print(f"Error during agent move: {e}")
+                move = None
+            if move is PENDING:
+                continue
+            try:
+                if move is None:
+                    # The worker failed or had no move; play the raw policy
+                    move = policy.predict_move(model, board, observer, cache)
+
+                play('capture' if board.is_capture(move) else 'move')
+                if learner:
+                    learner.record(obs_encoding.encode_board(board), move_encoding.encode(move))
+                animator.start(move_slides(board, move, images, pygame.time.get_ticks()))
+                state.push(move)
                 last_agent_move = move
-                undone_moves.clear()
                 turn_start_time = pygame.time.get_ticks()
 
-                if difficulty == "pro":
-                    model.learn(total_timesteps=1, reset_num_timesteps=False)
-                    model.save(model_path)
-
             except Exception as e:
                 print(f"Error during agent move: {e}")
 
@@ -522,11 +828,19 @@ def run_game(difficulty, theme, player_color, background=None):
 
 
 if __name__ == "__main__":
-    backgrounds = load_backgrounds()
+    profiler.trace_path = PROFILE_TRACE_PATH
     screen = pygame.display.set_mode((WIDTH + PANEL_WIDTH, HEIGHT))
+    preload_assets()
     while True:
-        difficulty, theme, background = show_main_menu(screen, backgrounds)
+        difficulty, theme, background = show_main_menu(screen)
         player_color = show_color_selection(screen)
-        run_game(difficulty, theme, player_color, background)
-        imageio.mimsave("gameplay.mp4", frames, fps=30)
+        recorder = None
+        if RECORD_GAMEPLAY:
+            from recorder import GameRecorder
+            recorder = GameRecorder(RECORD_PATH, fps=FPS, frame_skip=RECORD_FRAME_SKIP,
+                                    only_on_change=RECORD_ONLY_ON_CHANGE)
+        run_game(difficulty, theme, player_color, background, recorder)
+        if recorder:
+            recorder.close()
+        profiler.dump()
 
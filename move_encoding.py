@@ -0,0 +1,84 @@
+import chess
+import numpy as np
+
+# AlphaZero style 8x8x73 action layout: action = from_square * 73 + plane
+# planes  0-55: queen-like moves, 8 directions x 7 distances
+# planes 56-63: knight moves
+# planes 64-72: under-promotions (knight, bishop, rook) x (left, straight, right)
+PLANES = 73
+ACTION_SIZE = 64 * PLANES
+
+QUEEN_DIRECTIONS = [(0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1), (-1, 0), (-1, 1)]
+KNIGHT_OFFSETS = [(1, 2), (2, 1), (2, -1), (1, -2), (-1, -2), (-2, -1), (-2, 1), (-1, 2)]
+UNDERPROMOTIONS = [chess.KNIGHT, chess.BISHOP, chess.ROOK]
+
+
+def _build_tables():
+    moves = [chess.Move.null()] * ACTION_SIZE
+    promotable = np.zeros(ACTION_SIZE, dtype=bool)
+    index = {}
+
+    for from_square in chess.SQUARES:
+        file, rank = chess.square_file(from_square), chess.square_rank(from_square)
+        base = from_square * PLANES
+
+        for d, (df, dr) in enumerate(QUEEN_DIRECTIONS):
+            for dist in range(1, 8):
+                f, r = file + df * dist, rank + dr * dist
+                if not (0 <= f < 8 and 0 <= r < 8):
+                    break
+                action = base + d * 7 + dist - 1
+                move = chess.Move(from_square, chess.square(f, r))
+                moves[action] = move
+                index[move] = action
+                # A pawn stepping onto the back rank is a queen promotion
+                if dist == 1 and ((rank == 6 and r == 7) or (rank == 1 and r == 0)):
+                    promotable[action] = True
+                    index[chess.Move(from_square, move.to_square, chess.QUEEN)] = action
+
+        for k, (df, dr) in enumerate(KNIGHT_OFFSETS):
+            f, r = file + df, rank + dr
+            if 0 <= f < 8 and 0 <= r < 8:
+                action = base + 56 + k
+                move = chess.Move(from_square, chess.square(f, r))
+                moves[action] = move
+                index[move] = action
+
+        if rank in (1, 6):
+            dr = 1 if rank == 6 else -1
+            for p, piece_type in enumerate(UNDERPROMOTIONS):
+                for df in (-1, 0, 1):
+                    f = file + df
+                    if 0 <= f < 8:
+                        action = base + 64 + p * 3 + df + 1
+                        move = chess.Move(from_square, chess.square(f, rank + dr), piece_type)
+                        moves[action] = move
+                        index[move] = action
+
+    return moves, promotable, index
+
+
+ACTION_MOVES, PROMOTABLE, MOVE_INDEX = _build_tables()
+
+
+def encode(move):
+    return MOVE_INDEX.get(move, -1)
+
+
+def decode(action, board=None):
+    action = int(action)
+    if not 0 <= action < ACTION_SIZE:
+        return chess.Move.null()
+    move = ACTION_MOVES[action]
+    if board is not None and PROMOTABLE[action] and board.piece_type_at(move.from_square) == chess.PAWN:
+        return chess.Move(move.from_square, move.to_square, chess.QUEEN)
+    return move
+
+
+def legal_mask(board, out=None):
+    if out is None:
+        out = np.zeros(ACTION_SIZE, dtype=bool)
+    else:
+        out[:] = False
+    out[np.fromiter((MOVE_INDEX[m] for m in board.legal_moves), dtype=np.intp)] = True
+    return out
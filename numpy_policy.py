@@ -0,0 +1,53 @@
+import numpy as np
+
+ACTIVATIONS = {
+    "tanh": np.tanh,
+    "relu": lambda x: np.maximum(x, 0),
+}
+
+
+class NumpyPolicy:
+    # Forward pass of an exported SB3 MlpPolicy (see export_policy.py),
+    # evaluated with NumPy only
+    def __init__(self, arrays):
+        self.activation_name = str(arrays["activation"])
+        self.activation = ACTIVATIONS[self.activation_name]
+        self.pi_layers = self._layers(arrays, "pi")
+        self.vf_layers = self._layers(arrays, "vf")
+        self.action_weight = np.ascontiguousarray(arrays["action_weight"].T)
+        self.action_bias = arrays["action_bias"]
+        self.value_weight = np.ascontiguousarray(arrays["value_weight"].T)
+        self.value_bias = arrays["value_bias"]
+        self.obs_size = self.pi_layers[0][0].shape[0] if self.pi_layers else self.action_weight.shape[0]
+
+    @staticmethod
+    def _layers(arrays, prefix):
+        layers = []
+        while f"{prefix}_{len(layers)}_weight" in arrays:
+            i = len(layers)
+            # Stored as (out, in) like torch; keep (in, out) for x @ W
+            layers.append((np.ascontiguousarray(arrays[f"{prefix}_{i}_weight"].T), arrays[f"{prefix}_{i}_bias"]))
+        return layers
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls({k: data[k] for k in data.files})
+
+    def _hidden(self, obs, layers):
+        x = np.asarray(obs, dtype=np.float32).reshape(-1, self.obs_size)
+        for weight, bias in layers:
+            x = self.activation(x @ weight + bias)
+        return x
+
+    def logits(self, obs):
+        return self._hidden(obs, self.pi_layers) @ self.action_weight + self.action_bias
+
+    def values(self, obs):
+        return (self._hidden(obs, self.vf_layers) @ self.value_weight + self.value_bias)[:, 0]
+
+    def predict(self, obs, mask=None):
+        logits = self.logits(obs)[0]
+        if mask is not None:
+            logits = np.where(mask, logits, -np.inf)
+        return int(np.argmax(logits))
@@ -0,0 +1,94 @@
+import chess
+import numpy as np
+
+OBS_SHAPE = (8, 8, 12)
+
+# Packed observations: the 12 bitboards as little-endian uint64 (96 bytes),
+# then side to move, castling rights (bits K Q k q) and en-passant file + 1
+PACKED_SIZE = 104
+PACKED_STATE = 96
+
+PIECE_TYPES = [chess.PAWN, chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN, chess.KING]
+
+
+def board_masks(board):
+    # Plane order matches ChessEnv: white P N B R Q K, then black P N B R Q K
+    black, white = board.occupied_co
+    by_type = (board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings)
+    return [m & white for m in by_type] + [m & black for m in by_type]
+
+
+def unpack_masks(masks, out):
+    # masks: (..., 12) uint64 -> out: (..., 8, 8, 12), square = rank * 8 + file
+    masks = np.ascontiguousarray(masks, dtype="<u8")
+    octets = masks.view(np.uint8).reshape(masks.shape + (8,))
+    bits = np.unpackbits(octets, axis=-1, bitorder="little")
+    lead = masks.ndim - 1
+    bits = bits.reshape(masks.shape[:-1] + (12, 8, 8))
+    out[...] = bits.transpose(tuple(range(lead)) + (lead + 1, lead + 2, lead))
+    return out
+
+
+def encode_board(board, out=None):
+    if out is None:
+        out = np.empty(OBS_SHAPE, dtype=np.float32)
+    return unpack_masks(np.array(board_masks(board), dtype=np.uint64), out)
+
+
+def encode_boards(boards, out=None):
+    if out is None:
+        out = np.empty((len(boards),) + OBS_SHAPE, dtype=np.float32)
+    masks = np.array([board_masks(b) for b in boards], dtype=np.uint64).reshape(len(boards), 12)
+    return unpack_masks(masks, out)
+
+
+def board_state(board):
+    castling = (
+        board.has_kingside_castling_rights(chess.WHITE)
+        | board.has_queenside_castling_rights(chess.WHITE) << 1
+        | board.has_kingside_castling_rights(chess.BLACK) << 2
+        | board.has_queenside_castling_rights(chess.BLACK) << 3
+    )
+    ep_file = 0 if board.ep_square is None else chess.square_file(board.ep_square) + 1
+    return int(board.turn), castling, ep_file
+
+
+def pack_boards(boards, out=None):
+    if out is None:
+        out = np.zeros((len(boards), PACKED_SIZE), dtype=np.uint8)
+    masks = np.array([board_masks(b) for b in boards], dtype="<u8").reshape(len(boards), 12)
+    out[:, :PACKED_STATE] = masks.view(np.uint8)
+    out[:, PACKED_STATE:PACKED_STATE + 3] = np.array([board_state(b) for b in boards], dtype=np.uint8).reshape(-1, 3)
+    return out
+
+
+def pack_board(board, out=None):
+    if out is None:
+        out = np.zeros(PACKED_SIZE, dtype=np.uint8)
+    pack_boards([board], out[None])
+    return out
+
+
+def unpack_board(packed, out):
+    # packed: (..., PACKED_SIZE) uint8 -> out: (..., 8, 8, 12) piece planes
+    packed = np.ascontiguousarray(packed, dtype=np.uint8)
+    return unpack_masks(packed[..., :PACKED_STATE].copy().view("<u8"), out)
+
+
+class BoardObserver:
+    # Keeps one observation buffer in sync with whatever board it is shown,
+    # flipping only the squares whose piece bitboards changed since the
+    # previous call (typically 2-4 after a push or pop)
+    def __init__(self, dtype=np.float32):
+        self.obs = np.zeros(OBS_SHAPE, dtype=dtype)
+        self._masks = [0] * 12
+
+    def observe(self, board):
+        masks = board_masks(board)
+        for plane, (old, new) in enumerate(zip(self._masks, masks)):
+            changed = old ^ new
+            if changed:
+                for square in chess.scan_forward(changed):
+                    self.obs[square >> 3, square & 7, plane] = 1 if new >> square & 1 else 0
+        self._masks = masks
+        return self.obs
@@ -0,0 +1,46 @@
+import gymnasium as gym
+import torch
+from stable_baselines3.common.torch_layers import BaseFeaturesExtractor
+
+import obs_encoding
+
+PLANES = 8 * 8 * 12
+# Side to move, four castling rights and a one-hot en-passant file
+STATE_FEATURES = 1 + 4 + 8
+
+
+class PackedBoardExtractor(BaseFeaturesExtractor):
+    # Expands ChessEnv(obs_mode="packed") observations at batch time, so
+    # rollout buffers keep 104 bytes per position. The first 768 features are
+    # the piece planes in the same order as a flattened float32 observation;
+    # with include_state the side to move, castling and en-passant follow.
+    def __init__(self, observation_space: gym.spaces.Box, include_state=True):
+        super().__init__(observation_space, PLANES + (STATE_FEATURES if include_state else 0))
+        self.include_state = include_state
+        # Bit i of every byte value, looked up instead of shifted per batch
+        bits = (torch.arange(256)[:, None] >> torch.arange(8)) & 1
+        self.register_buffer("byte_bits", bits.float(), persistent=False)
+
+    def forward(self, observations):
+        # SB3 hands Box observations over as floats; the byte values are exact
+        packed = observations.long()
+        bits = torch.nn.functional.embedding(packed[:, :obs_encoding.PACKED_STATE], self.byte_bits)
+        # (batch, plane, square) -> (batch, square, plane), as in the 8x8x12 layout
+        planes = bits.reshape(-1, 12, 64).transpose(1, 2).reshape(-1, PLANES)
+        if not self.include_state:
+            return planes
+        state = packed[:, obs_encoding.PACKED_STATE:obs_encoding.PACKED_STATE + 3]
+        turn = state[:, :1].float()
+        castling = self.byte_bits[state[:, 1], :4]
+        ep_file = torch.nn.functional.one_hot(state[:, 2], 9)[:, 1:].float()
+        return torch.cat([planes, turn, castling, ep_file], dim=1)
+
+
+def policy_kwargs(obs_mode, include_state=True):
+    # Extra PPO policy_kwargs for a ChessEnv observation mode
+    if obs_mode != "packed":
+        return {}
+    return {
+        "features_extractor_class": PackedBoardExtractor,
+        "features_extractor_kwargs": {"include_state": include_state},
+    }
@@ -0,0 +1,234 @@
+import argparse
+import io
+import mmap
+import multiprocessing as mp
+import os
+import random
+import struct
+import time
+
+import chess
+import chess.pgn
+import numpy as np
+
+from pgn_dataset import RESULTS, game_chunks
+from prediction_cache import position_key
+
+# Book moves per difficulty: the agent plays from the book while fewer than
+# this many plies have been played, and asks the policy after that
+BOOK_PLIES = {
+    "easy": 4,
+    "medium": 8,
+    "hard": 12,
+    "pro": 16,
+}
+
+# Polyglot .bin layout: big-endian key, move, weight and learn fields, with
+# the entries sorted by key, so other polyglot readers can open the books too
+ENTRY_DTYPE = np.dtype([("key", ">u8"), ("move", ">u2"), ("weight", ">u2"), ("learn", ">u4")])
+ENTRY = struct.Struct(">QHHI")
+KEY = struct.Struct(">Q")
+PROMOTIONS = {chess.KNIGHT: 1, chess.BISHOP: 2, chess.ROOK: 3, chess.QUEEN: 4}
+PROMOTION_PIECES = {code: piece for piece, code in PROMOTIONS.items()}
+# Polyglot writes castling as the king capturing its own rook
+CASTLING_TO_BOOK = {
+    (chess.E1, chess.G1): chess.H1, (chess.E1, chess.C1): chess.A1,
+    (chess.E8, chess.G8): chess.H8, (chess.E8, chess.C8): chess.A8,
+}
+CASTLING_FROM_BOOK = {(from_square, rook): to_square
+                      for (from_square, to_square), rook in CASTLING_TO_BOOK.items()}
+
+
+def encode_move(board, move):
+    to_square = move.to_square
+    if board.is_castling(move):
+        to_square = CASTLING_TO_BOOK[move.from_square, move.to_square]
+    return to_square | move.from_square << 6 | PROMOTIONS.get(move.promotion, 0) << 12
+
+
+def decode_move(board, raw):
+    from_square, to_square = raw >> 6 & 0x3F, raw & 0x3F
+    promotion = PROMOTION_PIECES.get(raw >> 12 & 0x7)
+    if (from_square, to_square) in CASTLING_FROM_BOOK and board.king(board.turn) == from_square:
+        to_square = CASTLING_FROM_BOOK[from_square, to_square]
+    return chess.Move(from_square, to_square, promotion)
+
+
+def count_games(text, max_plies=16):
+    # Book statistics of every game in text: (key, move) -> [games, score],
+    # the score being 2 per win and 1 per draw for the side that moved
+    stats = {}
+    stream = io.StringIO(text)
+    while True:
+        game = chess.pgn.read_game(stream)
+        if game is None:
+            break
+        result = RESULTS.get(game.headers.get("Result"))
+        if result is None or game.errors or game.headers.get("Variant", "Standard") != "Standard":
+            continue
+        board = game.board()
+        for move in game.mainline_moves():
+            if len(board.move_stack) >= max_plies:
+                break
+            key = (position_key(board), encode_move(board, move))
+            entry = stats.setdefault(key, [0, 0])
+            entry[0] += 1
+            entry[1] += 1 + (result if board.turn == chess.WHITE else -result)
+            board.push(move)
+    return stats
+
+
+def _count_chunk(args):
+    return count_games(*args)
+
+
+def merge(total, stats):
+    for key, (games, score) in stats.items():
+        entry = total.setdefault(key, [0, 0])
+        entry[0] += games
+        entry[1] += score
+
+
+def book_entries(stats, min_games=1, weight="score"):
+    # Sorted polyglot entries. Weights are rescaled per position to fit the
+    # 16-bit field, keeping their ratios.
+    rows = [(key, move, games if weight == "games" else score)
+            for (key, move), (games, score) in stats.items() if games >= min_games]
+    entries = np.zeros(len(rows), dtype=ENTRY_DTYPE)
+    if not rows:
+        return entries
+    table = np.array(rows, dtype=[("key", "<u8"), ("move", "<u2"), ("weight", "<i8")])
+    table = table[np.lexsort((-table["weight"], table["key"]))]
+    starts = np.flatnonzero(np.r_[True, table["key"][1:] != table["key"][:-1]])
+    top = np.maximum.reduceat(table["weight"], starts)
+    scale = np.repeat(np.maximum(top / 0xFFFF, 1.0), np.diff(np.r_[starts, len(table)]))
+    entries["key"] = table["key"]
+    entries["move"] = table["move"]
+    entries["weight"] = np.round(table["weight"] / scale)
+    return entries
+
+
+def build(paths, out_path, max_plies=16, min_games=1, weight="score", workers=None, progress=True):
+    workers = workers or os.cpu_count()
+    tasks = ((text, max_plies) for text in game_chunks(paths))
+    total, chunks, started = {}, 0, time.perf_counter()
+    with mp.Pool(workers) as pool:
+        for stats in pool.imap_unordered(_count_chunk, tasks):
+            merge(total, stats)
+            chunks += 1
+            if progress:
+                print(f"\r{chunks} chunks, {len(total)} book moves", end="", flush=True)
+    if progress:
+        print()
+    entries = book_entries(total, min_games, weight)
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    tmp_path = out_path + ".tmp"
+    entries.tofile(tmp_path)
+    os.replace(tmp_path, out_path)
+    if progress:
+        print(f"Wrote {len(entries)} entries to {out_path} in {time.perf_counter() - started:.1f}s")
+    return len(entries)
+
+
+class OpeningBook:
+    # Memory-mapped polyglot book. A lookup is a binary search over the
+    # sorted keys in the mapped file, so only the pages it touches are read.
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        if size % ENTRY.size:
+            self._file.close()
+            raise ValueError(f"{path} is not a polyglot book")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self.size = size // ENTRY.size
+
+    def __len__(self):
+        return self.size
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+    def _key_at(self, index):
+        return KEY.unpack_from(self._map, index * ENTRY.size)[0]
+
+    def entries(self, key):
+        # (raw move, weight) of every entry for key
+        lo, hi = 0, self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        found = []
+        while lo < self.size:
+            entry_key, move, weight, _ = ENTRY.unpack_from(self._map, lo * ENTRY.size)
+            if entry_key != key:
+                break
+            found.append((move, weight))
+            lo += 1
+        return found
+
+    def moves(self, board):
+        # Legal book moves with their weights; a stray key collision or a
+        # corrupt entry simply yields nothing
+        moves = []
+        for raw, weight in self.entries(position_key(board)):
+            move = decode_move(board, raw)
+            if weight and board.is_legal(move):
+                moves.append((move, weight))
+        return moves
+
+    def choose(self, board, max_plies=None, rng=random):
+        # A weighted random book move, or None when out of book
+        if max_plies is not None and len(board.move_stack) >= max_plies:
+            return None
+        # Only the drawn move is checked for legality, which is most of the
+        # cost of a lookup; a bad entry is dropped and the draw repeated
+        entries = [entry for entry in self.entries(position_key(board)) if entry[1]]
+        while entries:
+            index = rng.choices(range(len(entries)), weights=[weight for _, weight in entries])[0]
+            move = decode_move(board, entries[index][0])
+            if board.is_legal(move):
+                return move
+            del entries[index]
+        return None
+
+
+def load_book(path):
+    # None when there is no book, so callers can fall through to the policy
+    if not path or not os.path.exists(path):
+        return None
+    return OpeningBook(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Polyglot opening books from PGN files")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build_parser = sub.add_parser("build", help="count the opening moves of PGN files into a book")
+    build_parser.add_argument("pgn", nargs="+", help="PGN files (plain, .gz or .bz2), e.g. arena.py --pgn output")
+    build_parser.add_argument("-o", "--out", default="chess_agent/book.bin")
+    build_parser.add_argument("--max-plies", type=int, default=max(BOOK_PLIES.values()),
+                              help="plies of each game to count")
+    build_parser.add_argument("--min-games", type=int, default=2, help="drop moves played in fewer games")
+    build_parser.add_argument("--weight", choices=["score", "games"], default="score",
+                              help="weigh moves by their score (2 per win, 1 per draw) or by games played")
+    build_parser.add_argument("--workers", type=int, default=os.cpu_count())
+    probe_parser = sub.add_parser("probe", help="list the book moves of a position")
+    probe_parser.add_argument("--book", default="chess_agent/book.bin")
+    probe_parser.add_argument("--fen", default=chess.STARTING_FEN)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build(args.pgn, args.out, args.max_plies, args.min_games, args.weight, args.workers)
+    else:
+        book = OpeningBook(args.book)
+        board = chess.Board(args.fen)
+        moves = book.moves(board)
+        total = sum(weight for _, weight in moves)
+        print(f"{len(book)} entries, {len(moves)} book moves for {board.fen()}")
+        for move, weight in sorted(moves, key=lambda item: -item[1]):
+            print(f"  {board.san(move):8} {weight:6} {100 * weight / total:5.1f}%")
@@ -0,0 +1,219 @@
+import argparse
+import bz2
+import gzip
+import io
+import json
+import multiprocessing as mp
+import os
+import time
+
+import chess
+import chess.pgn
+import numpy as np
+
+import move_encoding
+import obs_encoding
+
+INDEX_FILE = "index.json"
+FORMAT_VERSION = 1
+# Unfinished games ("*", e.g. arena games stopped at --max-plies) are skipped
+RESULTS = {"1-0": 1, "0-1": -1, "1/2-1/2": 0}
+
+
+def open_pgn(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rt", encoding="utf-8", errors="replace")
+    return open(path, encoding="utf-8", errors="replace")
+
+
+def game_chunks(paths, games_per_chunk=256):
+    # Splits PGN text into chunks of whole games without parsing them, so
+    # the parsing itself can run in the worker processes
+    for path in paths:
+        with open_pgn(path) as f:
+            lines, games, in_moves = [], 0, False
+            for line in f:
+                if line.startswith("["):
+                    if in_moves:
+                        games += 1
+                        in_moves = False
+                        if games == games_per_chunk:
+                            yield "".join(lines)
+                            lines, games = [], 0
+                elif line.strip():
+                    in_moves = True
+                lines.append(line)
+            if lines:
+                yield "".join(lines)
+
+
+def encode_games(text):
+    # Every position of every game in text: packed piece masks, the move
+    # played (ChessEnv action) and the game result from White's side
+    masks, actions, results = [], [], []
+    stream = io.StringIO(text)
+    while True:
+        game = chess.pgn.read_game(stream)
+        if game is None:
+            break
+        result = RESULTS.get(game.headers.get("Result"))
+        if result is None or game.errors:
+            continue
+        board = game.board()
+        for move in game.mainline_moves():
+            action = move_encoding.encode(move)
+            if action < 0:
+                break
+            masks.append(obs_encoding.board_masks(board))
+            actions.append(action)
+            results.append(result)
+            board.push(move)
+    return (
+        np.array(masks, dtype="<u8").reshape(-1, 12),
+        np.array(actions, dtype="<u2"),
+        np.array(results, dtype=np.int8),
+    )
+
+
+class ShardWriter:
+    # Buffers positions into shards of shard_size, shuffles each shard so
+    # consecutive positions come from different games, and writes the raw
+    # arrays plus an index that PositionDataset memory-maps
+    def __init__(self, out_dir, shard_size=1_000_000, seed=0):
+        self.out_dir = out_dir
+        self.shard_size = shard_size
+        self.rng = np.random.default_rng(seed)
+        self.shards = []
+        self.positions = 0
+        self._pending = []
+        self._pending_size = 0
+        os.makedirs(out_dir, exist_ok=True)
+
+    def add(self, masks, actions, results):
+        self._pending.append((masks, actions, results))
+        self._pending_size += len(actions)
+        while self._pending_size >= self.shard_size:
+            self._flush(self.shard_size)
+
+    def _flush(self, size):
+        masks, actions, results = (np.concatenate(parts) for parts in zip(*self._pending))
+        rest = (masks[size:], actions[size:], results[size:])
+        self._pending = [rest] if len(rest[1]) else []
+        self._pending_size = len(rest[1])
+        order = self.rng.permutation(size)
+        name = f"shard_{len(self.shards):05d}"
+        for suffix, array in [("masks", masks[:size]), ("actions", actions[:size]), ("results", results[:size])]:
+            array[order].tofile(os.path.join(self.out_dir, f"{name}.{suffix}"))
+        self.shards.append({"name": name, "positions": int(size)})
+        self.positions += int(size)
+
+    def close(self):
+        if self._pending_size:
+            self._flush(self._pending_size)
+        index = {
+            "version": FORMAT_VERSION,
+            "positions": self.positions,
+            "obs_shape": list(obs_encoding.OBS_SHAPE),
+            "action_size": move_encoding.ACTION_SIZE,
+            "shards": self.shards,
+        }
+        with open(os.path.join(self.out_dir, INDEX_FILE), "w") as f:
+            json.dump(index, f, indent=2)
+
+
+def build(paths, out_dir, workers=None, shard_size=1_000_000, games_per_chunk=256, seed=0, progress=True):
+    writer = ShardWriter(out_dir, shard_size, seed)
+    start = time.perf_counter()
+    with mp.Pool(workers or os.cpu_count()) as pool:
+        for chunk in pool.imap(encode_games, game_chunks(paths, games_per_chunk)):
+            writer.add(*chunk)
+            if progress:
+                total = writer.positions + writer._pending_size
+                rate = total / (time.perf_counter() - start)
+                print(f"\r{total} positions, {rate:.0f} positions/s", end="", flush=True)
+    writer.close()
+    if progress:
+        print()
+    return writer.positions
+
+
+class PositionDataset:
+    # Read-only view of a built dataset. Shards are memory-mapped, so only
+    # the slices actually read are paged in. Indexing returns one
+    # (observation, action, result); batches() streams shuffled minibatches.
+    def __init__(self, path):
+        with open(os.path.join(path, INDEX_FILE)) as f:
+            self.index = json.load(f)
+        if self.index["version"] != FORMAT_VERSION:
+            raise ValueError(f"{path}: unsupported dataset version {self.index['version']}")
+        self.shards = []
+        for shard in self.index["shards"]:
+            n = shard["positions"]
+            base = os.path.join(path, shard["name"])
+            self.shards.append((
+                np.memmap(base + ".masks", dtype="<u8", mode="r", shape=(n, 12)),
+                np.memmap(base + ".actions", dtype="<u2", mode="r", shape=(n,)),
+                np.memmap(base + ".results", dtype=np.int8, mode="r", shape=(n,)),
+            ))
+        self._offsets = np.cumsum([0] + [shard["positions"] for shard in self.index["shards"]])
+
+    def __len__(self):
+        return int(self._offsets[-1])
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        shard = int(np.searchsorted(self._offsets, i, side="right")) - 1
+        masks, actions, results = self.shards[shard]
+        j = i - self._offsets[shard]
+        obs = obs_encoding.unpack_masks(masks[j], np.empty(obs_encoding.OBS_SHAPE, dtype=np.float32))
+        return obs, int(actions[j]), int(results[j])
+
+    def batches(self, batch_size, shuffle=True, seed=None, packed=False, drop_last=True):
+        # Each minibatch is a contiguous slice of one shard (shards are
+        # shuffled when written), visited in random order. With packed=True
+        # the piece masks are the memmap slice itself; otherwise they are
+        # unpacked into one reused float32 buffer, valid until the next batch.
+        blocks = []
+        for s, (masks, _, _) in enumerate(self.shards):
+            for start in range(0, len(masks), batch_size):
+                if start + batch_size <= len(masks) or not drop_last:
+                    blocks.append((s, start))
+        if shuffle:
+            np.random.default_rng(seed).shuffle(blocks)
+        buffer = np.empty((batch_size,) + obs_encoding.OBS_SHAPE, dtype=np.float32)
+        for s, start in blocks:
+            masks, actions, results = self.shards[s]
+            stop = start + batch_size
+            if packed:
+                yield masks[start:stop], actions[start:stop], results[start:stop]
+            else:
+                obs = obs_encoding.unpack_masks(masks[start:stop], buffer[:len(masks[start:stop])])
+                yield obs, actions[start:stop], results[start:stop]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert PGN files into a memory-mapped position dataset")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build_parser = sub.add_parser("build", help="parse PGN (.pgn, .pgn.gz, .pgn.bz2) into shards")
+    build_parser.add_argument("pgn", nargs="+")
+    build_parser.add_argument("-o", "--out", required=True, help="output directory")
+    build_parser.add_argument("--workers", type=int, default=os.cpu_count())
+    build_parser.add_argument("--shard-size", type=int, default=1_000_000, help="positions per shard")
+    build_parser.add_argument("--seed", type=int, default=0)
+    info_parser = sub.add_parser("info", help="summarise a built dataset")
+    info_parser.add_argument("path")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build(args.pgn, args.out, args.workers, args.shard_size, seed=args.seed)
+    dataset = PositionDataset(args.out if args.command == "build" else args.path)
+    results = np.concatenate([r for _, _, r in dataset.shards]) if dataset.shards else np.zeros(0)
+    print(f"{len(dataset)} positions in {len(dataset.shards)} shards "
+          f"({len(dataset) * 96 / 2 ** 20:.1f} MB of piece planes); "
+          f"white wins {np.mean(results == 1):.1%}, draws {np.mean(results == 0):.1%}, "
+          f"black wins {np.mean(results == -1):.1%}")
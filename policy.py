@@ -0,0 +1,81 @@
+import os
+
+import numpy as np
+
+import move_encoding
+import obs_encoding
+from inference_client import RemotePolicy
+from numpy_policy import NumpyPolicy
+from prediction_cache import position_key
+
+
+def load_policy(model_path, server=None):
+    # With a server address, use the copy held by inference_server.py if it
+    # is running; otherwise load locally, preferring an exported NumPy
+    # policy (export_policy.py) since it needs no torch
+    if server:
+        remote = RemotePolicy(server, os.path.basename(model_path))
+        try:
+            if remote.name in remote.models():
+                return remote
+        except OSError:
+            pass
+        remote.close()
+    if os.path.exists(model_path + ".npz"):
+        return NumpyPolicy.load(model_path + ".npz")
+    from stable_baselines3 import PPO
+    return PPO.load(model_path)
+
+
+def policy_logits(model, obs):
+    if isinstance(model, NumpyPolicy):
+        return model.logits(obs)[0]
+    if isinstance(model, RemotePolicy):
+        return model.evaluate(np.reshape(obs, (1,) + obs_encoding.OBS_SHAPE))[0][0]
+    import torch
+    obs_tensor, _ = model.policy.obs_to_tensor(obs)
+    with torch.no_grad():
+        distribution = model.policy.get_distribution(obs_tensor)
+    return distribution.distribution.logits.cpu().numpy().reshape(-1)
+
+
+def policy_evaluate(model, obs):
+    # Batched policy logits and value estimates for a stack of observations
+    if isinstance(model, NumpyPolicy):
+        return model.logits(obs), model.values(obs)
+    if isinstance(model, RemotePolicy):
+        return model.evaluate(obs)
+    import torch
+    obs_tensor, _ = model.policy.obs_to_tensor(obs)
+    with torch.no_grad():
+        logits = model.policy.get_distribution(obs_tensor).distribution.logits
+        values = model.policy.predict_values(obs_tensor)
+    return logits.cpu().numpy(), values.cpu().numpy().reshape(-1)
+
+
+def masked_argmax(logits, mask):
+    return int(np.argmax(np.where(mask, logits, -np.inf)))
+
+
+def masked_predict(model, obs, mask):
+    return masked_argmax(policy_logits(model, obs), mask)
+
+
+def legal_evaluation(model, board, observer=None, cache=None):
+    # Logits of the legal actions (in action order) and the value estimate,
+    # served from cache when the position has been evaluated before
+    actions = np.flatnonzero(move_encoding.legal_mask(board))
+    key = position_key(board) if cache is not None else None
+    entry = cache.get(key) if cache is not None else None
+    if entry is None:
+        obs = observer.observe(board) if observer is not None else obs_encoding.encode_board(board)
+        logits, values = policy_evaluate(model, obs[None])
+        entry = (logits[0][actions], values[0])
+        if cache is not None:
+            cache.put(key, *entry)
+    return actions, entry[0], entry[1]
+
+
+def predict_move(model, board, observer=None, cache=None):
+    actions, logits, _ = legal_evaluation(model, board, observer, cache)
+    return move_encoding.decode(actions[np.argmax(logits)], board)
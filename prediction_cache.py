@@ -0,0 +1,219 @@
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import chess
+import chess.polyglot
+import numpy as np
+
+from obs_encoding import board_masks
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+MAX_LEGAL_MOVES = 218  # most legal moves in any reachable chess position
+PROBES = 8
+
+HEADER_DTYPE = np.dtype([("magic", "S8"), ("slots", "<u8"), ("fingerprint", "<u8")])
+SLOT_DTYPE = np.dtype([
+    ("key", "<u8"),
+    ("value", "<f4"),
+    ("count", "<u2"),
+    ("logits", "<f4", (MAX_LEGAL_MOVES,)),
+])
+MAGIC = b"PCACHE01"
+
+_RANDOM = chess.polyglot.POLYGLOT_RANDOM_ARRAY
+_HASHER = chess.polyglot.ZobristHasher(_RANDOM)
+# Polyglot piece keys laid out like board_masks: plane-major, then square
+_PIECE_KEYS = np.array(
+    [_RANDOM[64 * ((piece_type - 1) * 2 + color) + square]
+     for color in (1, 0) for piece_type in chess.PIECE_TYPES for square in chess.SQUARES],
+    dtype=np.uint64,
+)
+_CASTLING_KEYS = [(chess.BB_H1, _RANDOM[768]), (chess.BB_A1, _RANDOM[769]),
+                  (chess.BB_H8, _RANDOM[770]), (chess.BB_A8, _RANDOM[771])]
+
+
+def position_key(board):
+    # Same value as chess.polyglot.zobrist_hash, with the piece keys XORed
+    # in one vectorised pass instead of a loop over squares
+    masks = np.array(board_masks(board), dtype="<u8")
+    bits = np.unpackbits(masks.view(np.uint8), bitorder="little").view(bool)
+    key = int(np.bitwise_xor.reduce(_PIECE_KEYS[bits]))
+    rights = board.clean_castling_rights()
+    for mask, value in _CASTLING_KEYS:
+        if rights & mask:
+            key ^= value
+    if board.ep_square is not None:
+        key ^= _HASHER.hash_ep_square(board)
+    if board.turn == chess.WHITE:
+        key ^= _RANDOM[780]
+    return key
+
+
+@contextmanager
+def _file_lock(fd):
+    # Exclusive lock across processes sharing the file (GUI, arena, ...)
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+    try:
+        yield
+    finally:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        else:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+class DiskTable:
+    # Open-addressed table of policy evaluations in a memory-mapped file.
+    # A key probes PROBES slots from key % slots (the table has PROBES spare
+    # slots at the end, so probes never wrap); when all are taken the home
+    # slot is overwritten, like a transposition table.
+    # Several processes may share the file: writers take a file lock, and a
+    # slot's key is cleared while its payload is rewritten, so readers check
+    # the key again after copying and treat a changed key as a miss.
+    def __init__(self, path, slots=16384, fingerprint=0):
+        self.path = path
+        self.slots = slots
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+        try:
+            with _file_lock(self._fd):
+                self._open(path, slots, fingerprint)
+        except Exception:
+            os.close(self._fd)
+            raise
+
+    def _open(self, path, slots, fingerprint):
+        size = HEADER_DTYPE.itemsize + (slots + PROBES) * SLOT_DTYPE.itemsize
+        fresh = os.fstat(self._fd).st_size != size
+        if not fresh:
+            header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)[0]
+            fresh = header["magic"] != MAGIC or header["slots"] != slots or header["fingerprint"] != fingerprint
+        if fresh:
+            # Resize in place rather than recreating the file, so processes
+            # holding the old one see the cleared table
+            os.ftruncate(self._fd, 0)
+            os.ftruncate(self._fd, size)
+        self.header = np.memmap(path, dtype=HEADER_DTYPE, mode="r+", shape=(1,))
+        if fresh:
+            self.header[0] = (MAGIC, slots, fingerprint)
+        self.table = np.memmap(path, dtype=SLOT_DTYPE, mode="r+", offset=HEADER_DTYPE.itemsize,
+                               shape=(slots + PROBES,))
+        # Plain ndarray views skip memmap's per-access overhead
+        table = self.table.view(np.ndarray)
+        self.keys = table["key"]
+        self.values = table["value"]
+        self.counts = table["count"]
+        self.logits = table["logits"]
+
+    def get(self, key):
+        home = key % self.slots
+        window = self.keys[home:home + PROBES].tolist()
+        if key not in window:
+            return None
+        i = home + window.index(key)
+        entry = self.logits[i, :self.counts[i]].copy(), float(self.values[i])
+        if self.keys[i] != key:
+            return None  # rewritten by another process while we copied
+        return entry
+
+    def put(self, key, logits, value):
+        if len(logits) > MAX_LEGAL_MOVES:
+            return
+        home = key % self.slots
+        with _file_lock(self._fd):
+            window = self.keys[home:home + PROBES].tolist()
+            if key in window:
+                i = home + window.index(key)
+            elif 0 in window:
+                i = home + window.index(0)
+            else:
+                i = home
+            # Unpublish the slot, fill it, then publish the new key
+            self.keys[i] = 0
+            self.logits[i, :len(logits)] = logits
+            self.counts[i] = len(logits)
+            self.values[i] = value
+            self.keys[i] = key
+
+    def clear(self):
+        with _file_lock(self._fd):
+            self.keys[:] = 0
+
+    def flush(self):
+        self.table.flush()
+        self.header.flush()
+
+    def close(self):
+        self.flush()
+        os.close(self._fd)
+
+
+class PredictionCache:
+    # Bounded LRU of policy evaluations keyed by Zobrist hash: the logits of
+    # the legal actions (in action order) and the value estimate. Backed by
+    # an optional DiskTable so a warm cache survives restarts.
+    def __init__(self, max_entries=100_000, path=None, slots=16384, fingerprint=0):
+        self.max_entries = max_entries
+        self.disk = DiskTable(path, slots, fingerprint) if path else None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            if self.disk is not None:
+                entry = self.disk.get(key)
+                if entry is not None:
+                    self.disk_hits += 1
+                    self._remember(key, entry)
+                    return entry
+            self.misses += 1
+            return None
+
+    def put(self, key, logits, value):
+        entry = (np.asarray(logits, dtype=np.float32), float(value))
+        with self._lock:
+            self._remember(key, entry)
+            if self.disk is not None:
+                self.disk.put(key, *entry)
+
+    def _remember(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.disk_hits + self.misses
+        return (self.hits + self.disk_hits) / lookups if lookups else 0.0
+
+    def clear(self):
+        # Call when the model's weights change; drops the disk copy too
+        with self._lock:
+            self._entries.clear()
+            if self.disk is not None:
+                self.disk.clear()
+
+    def flush(self):
+        if self.disk is not None:
+            with self._lock:
+                self.disk.flush()
@@ -0,0 +1,198 @@
+import atexit
+import multiprocessing as mp
+import os
+import queue
+import tempfile
+
+import numpy as np
+import torch
+from stable_baselines3 import PPO
+from stable_baselines3.common.logger import configure
+
+from chess_env import ChessEnv
+
+
+def atomic_save(model, path):
+    # Write next to the target and rename so a crash never leaves a torn zip
+    if not path.endswith(".zip"):
+        path += ".zip"
+    folder = os.path.dirname(path) or "."
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=folder, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            model.save(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _load_model(model_path, n_steps):
+    env = ChessEnv()
+    try:
+        model = PPO.load(model_path, env=env, device="cpu", n_steps=n_steps, batch_size=n_steps)
+    except Exception:
+        model = PPO("MlpPolicy", env, n_steps=n_steps, batch_size=n_steps, device="cpu", verbose=0)
+    model.set_logger(configure(None, []))
+    return model
+
+
+def _state_arrays(model):
+    return {k: v.detach().cpu().numpy() for k, v in model.policy.state_dict().items()}
+
+
+def _learner_main(model_path, inbox, outbox, n_steps, checkpoint_every):
+    torch.set_num_threads(1)
+    # Weights left unread after close must not keep this process alive
+    outbox.cancel_join_thread()
+    model = _load_model(model_path, n_steps)
+    buffer = model.rollout_buffer
+    outbox.put(_state_arrays(model))
+
+    pending = None
+    episode_start = True
+    game_start = 0  # buffer position of the current game's first transition
+    updates = 0
+    dirty = False
+
+    def update(last_value, done):
+        nonlocal updates, dirty, game_start
+        size = buffer.buffer_size
+        if not buffer.full:
+            # Train on the filled part only, e.g. the games left at close
+            for name in ("observations", "actions", "rewards", "returns", "episode_starts",
+                         "values", "log_probs", "advantages"):
+                setattr(buffer, name, getattr(buffer, name)[:buffer.pos])
+            buffer.buffer_size = buffer.pos
+            buffer.full = True
+        buffer.compute_returns_and_advantage(last_values=last_value, dones=np.array([done]))
+        model.train()
+        buffer.buffer_size = size
+        buffer.reset()
+        game_start = 0
+        outbox.put(_state_arrays(model))
+        updates += 1
+        dirty = True
+        if updates % checkpoint_every == 0:
+            atomic_save(model, model_path)
+            dirty = False
+
+    def add(reward, done, next_obs):
+        obs, action, start = pending
+        obs_tensor, _ = model.policy.obs_to_tensor(obs)
+        with torch.no_grad():
+            value, log_prob, _ = model.policy.evaluate_actions(obs_tensor, torch.as_tensor([action]))
+        buffer.add(obs[None], np.array([action]), np.array([reward]), np.array([start]), value, log_prob)
+        if not buffer.full:
+            return
+        with torch.no_grad():
+            if done:
+                last_value = torch.zeros(1)
+            else:
+                last_value = model.policy.predict_values(model.policy.obs_to_tensor(next_obs)[0])
+        update(last_value, done)
+
+    while True:
+        msg = inbox.get()
+        if msg[0] == "step":
+            _, obs, action = msg
+            if pending is not None:
+                add(0.0, False, obs)
+            pending = (obs, action, episode_start)
+            episode_start = False
+        elif msg[0] == "end":
+            if pending is not None:
+                add(float(msg[1]), True, None)
+            pending = None
+            episode_start = True
+            game_start = buffer.pos
+        elif msg[0] == "discard":
+            # An abandoned game has no result to learn from; drop its
+            # transitions that have not been trained on yet
+            buffer.pos = game_start
+            pending = None
+            episode_start = True
+        elif msg[0] == "undo":
+            # Drop the agent's last moves, taken back by Undo; moves already
+            # trained on stay
+            undone = msg[1]
+            if pending is not None and undone:
+                pending = None
+                undone -= 1
+            buffer.pos = max(game_start, buffer.pos - undone)
+            episode_start = pending is None and buffer.pos == game_start
+        elif msg[0] == "close":
+            break
+
+    # Finished games that never filled a rollout would otherwise be lost;
+    # the game in progress has no result and is dropped
+    buffer.pos = game_start
+    if buffer.pos:
+        update(torch.zeros(1), True)
+    if dirty:
+        atomic_save(model, model_path)
+
+
+class ProLearner:
+    # Trains a copy of the Pro model in a separate process from the agent's
+    # game transitions and streams updated policy weights back. One learner
+    # lives for the whole session, so rollouts fill up across games.
+    def __init__(self, model_path, n_steps=64, checkpoint_every=4):
+        # Forking the GUI would copy its threads and torch/SDL locks into the
+        # child, so the learner starts fresh and imports only this module
+        ctx = mp.get_context("spawn")
+        self.inbox = ctx.Queue()
+        self.outbox = ctx.Queue()
+        self.process = ctx.Process(
+            target=_learner_main,
+            args=(model_path, self.inbox, self.outbox, n_steps, checkpoint_every),
+            daemon=True,
+        )
+        self.process.start()
+        self._state = None
+        self._synced = None
+        # sys.exit from any menu still trains on and saves the finished games
+        atexit.register(self.close, wait=True)
+
+    def record(self, obs, action):
+        self.inbox.put(("step", np.array(obs, dtype=np.float32), int(action)))
+
+    def finish(self, reward):
+        self.inbox.put(("end", reward))
+
+    def discard(self):
+        # Forget the game in progress, e.g. on Restart
+        self.inbox.put(("discard",))
+
+    def undo(self, moves):
+        # Forget the agent's last moves of the game in progress
+        if moves:
+            self.inbox.put(("undo", moves))
+
+    def sync(self, model):
+        # Swap in the newest published weights; call only while no predict
+        # is running on the model. A model reloaded from an older checkpoint
+        # gets the latest weights too.
+        fresh = False
+        try:
+            while True:
+                self._state = self.outbox.get_nowait()
+                fresh = True
+        except queue.Empty:
+            pass
+        if self._state is None or (not fresh and model is self._synced):
+            return False
+        model.policy.load_state_dict({k: torch.as_tensor(v) for k, v in self._state.items()})
+        self._synced = model
+        return True
+
+    def close(self, wait=False):
+        # The learner trains on the finished games left, writes its final
+        # checkpoint and exits on its own; wait before the interpreter exits
+        # or the daemon is killed first
+        if not self.process.is_alive():
+            return
+        self.inbox.put(("close",))
+        if wait:
+            self.process.join()
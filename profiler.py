@@ -0,0 +1,140 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, self.start, time.perf_counter())
+        return False
+
+
+def _rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        try:
+            import resource
+        except ImportError:
+            return 0.0
+        # Peak rather than current usage; KB on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if peak > 2 ** 32 else peak / 2 ** 10
+
+
+class Profiler:
+    # Stage timers for the game loop. While disabled, stage() hands back a
+    # shared no-op context manager, so instrumented code costs one check.
+    # Recent timings feed the in-game HUD; with a trace path, every timing is
+    # also kept as a Chrome trace event (chrome://tracing, Perfetto).
+    def __init__(self, enabled=False, trace_path=None, window=60, max_events=500_000):
+        self.trace_path = trace_path
+        self.enabled = enabled or trace_path is not None
+        self.window = window
+        self._stages = {}
+        self._frames = deque(maxlen=window)
+        self._events = deque(maxlen=max_events)
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._last_frame = None
+
+    def stage(self, name):
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def timed(self, name):
+        def wrap(fn):
+            @functools.wraps(fn)
+            def timed_fn(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                with _Timer(self, name):
+                    return fn(*args, **kwargs)
+            return timed_fn
+        return wrap
+
+    def record(self, name, start, end):
+        with self._lock:
+            samples = self._stages.get(name)
+            if samples is None:
+                samples = self._stages[name] = deque(maxlen=self.window)
+            samples.append(end - start)
+            if self.trace_path:
+                self._events.append((name, start, end, threading.get_ident()))
+
+    def frame(self):
+        # Call once per loop iteration
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        if self._last_frame is not None:
+            self._frames.append(now - self._last_frame)
+            if self.trace_path:
+                with self._lock:
+                    self._events.append(("frame", self._last_frame, now, threading.get_ident()))
+        self._last_frame = now
+
+    @property
+    def fps(self):
+        total = sum(self._frames)
+        return len(self._frames) / total if total else 0.0
+
+    def stage_ms(self):
+        # Mean milliseconds per call over the recent window
+        with self._lock:
+            return {name: 1000 * sum(s) / len(s) for name, s in self._stages.items() if s}
+
+    def hud_lines(self):
+        lines = [f"FPS {self.fps:.1f}", f"RSS {_rss_mb():.0f} MB"]
+        lines += [f"{name} {ms:.1f}ms" for name, ms in sorted(self.stage_ms().items())]
+        return lines
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._frames.clear()
+            self._last_frame = None
+
+    def dump(self, path=None):
+        path = path or self.trace_path
+        if not path:
+            return None
+        pid = os.getpid()
+        with self._lock:
+            events = [
+                {"name": name, "ph": "X", "pid": pid, "tid": tid,
+                 "ts": (start - self._origin) * 1e6, "dur": (end - start) * 1e6}
+                for name, start, end, tid in self._events
+            ]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return path
+
+
+profiler = Profiler()
@@ -0,0 +1,83 @@
+import queue
+import threading
+
+import imageio
+import numpy as np
+import pygame
+
+
+class GameRecorder:
+    # Streams screen frames to a video file from a background thread.
+    # Frames are copied into a fixed pool of buffers, so memory stays flat
+    # however long the game runs; if the encoder falls behind, frames are
+    # dropped instead of queued.
+    def __init__(self, path, fps=30, frame_skip=1, only_on_change=False, enabled=True, pool_size=8):
+        self.path = path
+        self.fps = fps
+        self.frame_skip = max(1, frame_skip)
+        self.only_on_change = only_on_change
+        self.enabled = enabled
+        self.pool_size = pool_size
+        self.captured = 0
+        self.dropped = 0
+        self._counter = 0
+        self._last_key = None
+        self._free = None
+        self._pending = None
+        self._thread = None
+
+    def _start(self, size):
+        width, height = size
+        self._free = queue.Queue()
+        for _ in range(self.pool_size):
+            self._free.put(np.empty((height, width, 3), dtype=np.uint8))
+        self._pending = queue.Queue()
+        self._thread = threading.Thread(target=self._encode, name="recorder", daemon=True)
+        self._thread.start()
+
+    def _encode(self):
+        writer = None
+        try:
+            while True:
+                frame = self._pending.get()
+                if frame is None:
+                    break
+                if writer is None:
+                    writer = imageio.get_writer(self.path, fps=self.fps)
+                writer.append_data(frame)
+                self._free.put(frame)
+        except Exception as e:
+            print(f"Recording disabled: {e}")
+            self.enabled = False
+        finally:
+            if writer is not None:
+                writer.close()
+
+    def capture(self, surface, key=None):
+        if not self.enabled:
+            return
+        self._counter += 1
+        if (self._counter - 1) % self.frame_skip:
+            return
+        if self.only_on_change:
+            if key == self._last_key:
+                return
+            self._last_key = key
+        if self._thread is None:
+            self._start(surface.get_size())
+        try:
+            frame = self._free.get_nowait()
+        except queue.Empty:
+            self.dropped += 1
+            return
+        pixels = pygame.surfarray.pixels3d(surface)
+        np.copyto(frame, pixels.transpose(1, 0, 2))
+        del pixels
+        self._pending.put(frame)
+        self.captured += 1
+
+    def close(self):
+        if self._thread is not None:
+            self._pending.put(None)
+            self._thread.join()
+            self._thread = None
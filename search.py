@@ -0,0 +1,225 @@
+import math
+import threading
+import time
+
+import chess
+import numpy as np
+
+import move_encoding
+import obs_encoding
+import policy
+from game_state import position_outcome
+from prediction_cache import position_key
+
+# Simulations per agent move for each difficulty; 0 plays the raw policy
+SEARCH_NODES = {
+    "easy": 0,
+    "medium": 96,
+    "hard": 384,
+    "pro": 800,
+}
+
+
+class _Node:
+    __slots__ = ("moves", "priors", "visits", "values", "children", "terminal", "pending")
+
+    def __init__(self):
+        self.moves = None
+        self.priors = None
+        self.visits = None
+        self.values = None
+        self.children = None
+        self.terminal = None
+        self.pending = False
+
+    def expand(self, moves, priors):
+        self.moves = moves
+        self.priors = priors
+        self.visits = np.zeros(len(moves))
+        self.values = np.zeros(len(moves))
+        self.children = [None] * len(moves)
+
+    def pick(self, c_puct):
+        visits = self.visits
+        q = np.divide(self.values, visits, out=np.zeros_like(visits), where=visits > 0)
+        u = c_puct * math.sqrt(visits.sum() + 1) * self.priors / (1 + visits)
+        return int(np.argmax(q + u))
+
+    def child(self, move):
+        if self.moves is None:
+            return None
+        try:
+            return self.children[self.moves.index(move)]
+        except ValueError:
+            return None
+
+
+def _terminal_value(board, mask, root=False):
+    # Value for the side to move, or None if the game goes on. Below the root
+    # a claimable draw ends the line, but at the root the game only ends
+    # where GameState ends it, so there is always a move to return.
+    if root:
+        outcome = position_outcome(board, mask)
+        if outcome is None:
+            return None
+        return 0.0 if outcome.winner is None else -1.0
+    if not mask.any():
+        return -1.0 if board.is_check() else 0.0
+    if board.is_insufficient_material() or board.halfmove_clock >= 100 or board.is_repetition(3):
+        return 0.0
+    return None
+
+
+class PolicySearch:
+    # PUCT tree search guided by a PPO policy: the policy head gives move
+    # priors and the value head scores leaves, evaluated in batches. The
+    # subtree under the position actually reached is reused on the next call,
+    # and an optional PredictionCache skips positions evaluated before.
+    def __init__(self, model, nodes=400, time_limit=None, batch_size=16, c_puct=1.5, cache=None):
+        self.model = model
+        self.cache = cache
+        self.nodes = nodes
+        self.time_limit = time_limit
+        self.batch_size = batch_size
+        self.c_puct = c_puct
+        self._obs = np.empty((batch_size,) + obs_encoding.OBS_SHAPE, dtype=np.float32)
+        self._stop = threading.Event()
+        self._root = None
+        self._root_stack = None
+        self._root_start = None
+        self.stats = {}
+
+    def reset(self):
+        self._root = None
+
+    def stop(self):
+        # Ends a running search at the next batch boundary
+        self._stop.set()
+
+    def _root_for(self, board):
+        stack = board.move_stack
+        start = board.root().fen()
+        node = None
+        if self._root is not None and start == self._root_start:
+            known = len(self._root_stack)
+            if stack[:known] == self._root_stack:
+                node = self._root
+                for move in stack[known:]:
+                    node = node.child(move)
+                    if node is None:
+                        break
+        if node is None:
+            node = _Node()
+        self._root = node
+        self._root_stack = list(stack)
+        self._root_start = start
+        return node
+
+    def _select(self, root, board):
+        node, path = root, []
+        while node.moves is not None and node.terminal is None:
+            i = node.pick(self.c_puct)
+            # Virtual loss steers the rest of the batch onto other lines
+            node.visits[i] += 1
+            node.values[i] -= 1
+            path.append((node, i))
+            board.push(node.moves[i])
+            if node.children[i] is None:
+                node.children[i] = _Node()
+            node = node.children[i]
+        return node, path
+
+    @staticmethod
+    def _backup(path, value):
+        # value is for the side to move at the leaf
+        for node, i in reversed(path):
+            value = -value
+            node.values[i] += value + 1
+
+    @staticmethod
+    def _revert(path):
+        for node, i in path:
+            node.visits[i] -= 1
+            node.values[i] += 1
+
+    def _run_batch(self, root, board, limit):
+        leaves = []
+        for _ in range(limit):
+            node, path = self._select(root, board)
+            if node.terminal is None and not node.pending:
+                mask = move_encoding.legal_mask(board)
+                node.terminal = _terminal_value(board, mask, root=not path)
+                if node.terminal is None:
+                    actions = np.flatnonzero(mask)
+                    moves = [move_encoding.decode(a, board) for a in actions]
+                    key = position_key(board) if self.cache is not None else None
+                    entry = self.cache.get(key) if self.cache is not None else None
+                    if entry is not None:
+                        self._expand(node, path, moves, entry[0], entry[1], board.turn)
+                    else:
+                        obs_encoding.encode_board(board, self._obs[len(leaves)])
+                        leaves.append((node, path, actions, moves, board.turn, key))
+                        node.pending = True
+            elif node.pending:
+                # Already queued in this batch; stop rather than re-walk it
+                self._revert(path)
+                for _ in path:
+                    board.pop()
+                break
+            if node.terminal is not None:
+                self._backup(path, node.terminal)
+            for _ in path:
+                board.pop()
+        if leaves:
+            logits, values = policy.policy_evaluate(self.model, self._obs[:len(leaves)])
+            for (node, path, actions, moves, turn, key), row, value in zip(leaves, logits, values):
+                node.pending = False
+                if self.cache is not None:
+                    self.cache.put(key, row[actions], value)
+                self._expand(node, path, moves, row[actions], value, turn)
+        return len(leaves)
+
+    def _expand(self, node, path, moves, logits, value, turn):
+        priors = np.exp(logits.astype(np.float64) - logits.max())
+        node.expand(moves, priors / priors.sum())
+        # The value head scores positions from White's side
+        value = float(np.clip(value, -1, 1))
+        self._backup(path, value if turn == chess.WHITE else -value)
+
+    def search(self, board, nodes=None, time_limit=None):
+        nodes = self.nodes if nodes is None else nodes
+        time_limit = self.time_limit if time_limit is None else time_limit
+        self._stop.clear()
+        root = self._root_for(board)
+        board = board.copy()
+        start = time.perf_counter()
+        batches = evaluated = 0
+        if root.terminal is not None:
+            # Reached as a claimable draw in an earlier search; rescore it as the root
+            root.terminal = _terminal_value(board, move_encoding.legal_mask(board), root=True)
+        reused = int(root.visits.sum()) if root.visits is not None else 0
+        if root.moves is None and root.terminal is None:
+            evaluated += self._run_batch(root, board, 1)
+            batches += 1
+        done = reused
+        while root.moves and done < nodes and not self._stop.is_set():
+            if time_limit is not None and time.perf_counter() - start >= time_limit:
+                break
+            evaluated += self._run_batch(root, board, max(1, min(self.batch_size, nodes - done)))
+            batches += 1
+            done = int(root.visits.sum())
+        elapsed = time.perf_counter() - start
+        simulations = done - reused
+        self.stats = {
+            "simulations": simulations,
+            "reused": reused,
+            "evaluated": evaluated,
+            "batches": batches,
+            "mean_batch": evaluated / batches if batches else 0.0,
+            "seconds": elapsed,
+            "nodes_per_second": simulations / elapsed if elapsed > 0 else 0.0,
+        }
+        if not root.moves:
+            return None
+        # Most visited move; priors break ties (e.g. an unsearched root)
+        return root.moves[int(np.argmax(root.visits + 0.5 * root.priors))]
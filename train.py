@@ -0,0 +1,396 @@
+import argparse
+import json
+import os
+import shutil
+import time
+from collections import deque
+
+import chess
+import numpy as np
+import torch
+from gymnasium import spaces
+from stable_baselines3 import PPO
+from stable_baselines3.common.callbacks import BaseCallback
+from stable_baselines3.common.logger import configure
+from stable_baselines3.common.policies import ActorCriticPolicy
+from stable_baselines3.common.vec_env import VecEnvWrapper
+
+import arena
+import move_encoding
+import obs_encoding
+from batched_env import PASS, BatchedChessEnv
+from chess_env import ChessEnv
+from export_policy import load_policy_arrays, policy_arrays
+from numpy_policy import NumpyPolicy
+from obs_features import PackedBoardExtractor
+from pro_learner import atomic_save
+
+LEVELS = ["easy", "medium", "hard", "pro"]
+ACTIVATIONS = {"tanh": torch.nn.Tanh, "relu": torch.nn.ReLU}
+STATE_FILE = "state.json"
+LATEST = "latest.zip"
+# Learner observations: the packed board, then its legal-action mask as bits
+MASK_BYTES = move_encoding.ACTION_SIZE // 8
+OBS_SIZE = obs_encoding.PACKED_SIZE + MASK_BYTES
+
+
+class SelfPlayPolicy(ActorCriticPolicy):
+    # The network's value head keeps the convention search.py relies on
+    # (positions scored from White's side); the learner's value is that
+    # signed by the side to move, read from the packed observation.
+    # Illegal actions are masked out of the policy with the mask bits that
+    # SelfPlayVecEnv appends to each observation, so PPO's log-probs are
+    # those of the moves actually played.
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        bits = (torch.arange(256)[:, None] >> torch.arange(8)) & 1
+        self.register_buffer("byte_bits", bits.bool(), persistent=False)
+
+    @staticmethod
+    def _side(obs):
+        return obs[:, obs_encoding.PACKED_STATE:obs_encoding.PACKED_STATE + 1].float() * 2 - 1
+
+    def _legal(self, obs):
+        packed = obs[:, obs_encoding.PACKED_SIZE:].long()
+        return self.byte_bits[packed].reshape(len(obs), move_encoding.ACTION_SIZE)
+
+    def extract_features(self, obs, features_extractor=None):
+        # The features extractor only sees the board bytes
+        return super().extract_features(obs[:, :obs_encoding.PACKED_SIZE], features_extractor)
+
+    def _latent(self, obs):
+        features = self.extract_features(obs)
+        if self.share_features_extractor:
+            return self.mlp_extractor(features)
+        pi_features, vf_features = features
+        return self.mlp_extractor.forward_actor(pi_features), self.mlp_extractor.forward_critic(vf_features)
+
+    def _distribution(self, latent_pi, obs):
+        # A large negative logit rather than -inf keeps the entropy finite
+        logits = self.action_net(latent_pi).masked_fill(~self._legal(obs), -1e8)
+        return self.action_dist.proba_distribution(action_logits=logits)
+
+    def forward(self, obs, deterministic=False):
+        latent_pi, latent_vf = self._latent(obs)
+        distribution = self._distribution(latent_pi, obs)
+        actions = distribution.get_actions(deterministic=deterministic)
+        values = self.value_net(latent_vf) * self._side(obs)
+        return actions, values, distribution.log_prob(actions)
+
+    def evaluate_actions(self, obs, actions):
+        latent_pi, latent_vf = self._latent(obs)
+        distribution = self._distribution(latent_pi, obs)
+        values = self.value_net(latent_vf) * self._side(obs)
+        return values, distribution.log_prob(actions), distribution.entropy()
+
+    def get_distribution(self, obs):
+        return self._distribution(self._latent(obs)[0], obs)
+
+    def predict_values(self, obs):
+        return self.value_net(self._latent(obs)[1]) * self._side(obs)
+
+
+class SelfPlayVecEnv(VecEnvWrapper):
+    # Every board is a game between the learner and an opponent from the
+    # pool: a frozen NumpyPolicy snapshot, or None for a random mover. Colour
+    # and opponent are drawn per game. Opponent moves are evaluated in one
+    # batch per opponent and played inside step(), so the learner only sees
+    # its own turns, and rewards are from its side. Observations are the
+    # packed boards followed by their legal masks (see SelfPlayPolicy).
+    def __init__(self, venv, opponents, seed=0, temperature=1.0):
+        super().__init__(venv, spaces.Box(low=0, high=255, shape=(OBS_SIZE,), dtype=np.uint8))
+        self.opponents = list(opponents)
+        self.temperature = temperature
+        self.rng = np.random.default_rng(seed)
+        self.colors = np.zeros(self.num_envs, dtype=bool)
+        self.turns = np.ones(self.num_envs, dtype=bool)
+        self.playing = [None] * self.num_envs
+        self.scores = deque(maxlen=2000)
+        self.plies = 0
+        self._actions = None
+
+    def set_opponents(self, opponents):
+        # Running games keep their opponent; new games draw from this pool
+        self.opponents = list(opponents)
+
+    def _new_game(self, i):
+        self.colors[i] = self.rng.random() < 0.5
+        self.turns[i] = chess.WHITE
+        self.playing[i] = self.opponents[self.rng.integers(len(self.opponents))]
+
+    def _end_game(self, i, reward):
+        self.scores.append((reward + 1) / 2)
+        self._new_game(i)
+
+    def reset(self):
+        obs = self.venv.reset()
+        for i in range(self.num_envs):
+            self._new_game(i)
+        rewards = np.zeros(self.num_envs, dtype=np.float32)
+        dones = np.zeros(self.num_envs, dtype=bool)
+        return self._opponent_moves(obs, rewards, dones, [{} for _ in range(self.num_envs)])[0]
+
+    def step_async(self, actions):
+        self._actions = actions
+
+    def step_wait(self):
+        self.venv.step_async(self._actions)
+        obs, rewards, dones, infos = self.venv.step_wait()
+        self.plies += self.num_envs
+        rewards = rewards * np.where(self.colors, 1, -1).astype(np.float32)
+        for i in range(self.num_envs):
+            if dones[i]:
+                self._end_game(i, rewards[i])
+            else:
+                self.turns[i] = not self.turns[i]
+        return self._opponent_moves(obs, rewards, dones, infos)
+
+    def _opponent_moves(self, obs, rewards, dones, infos):
+        # Boards whose game just ended may start with the opponent as White,
+        # and a reply can end a game too, hence the loop (at most two rounds)
+        while True:
+            pending = np.flatnonzero(self.turns != self.colors)
+            if not len(pending):
+                return self._with_masks(obs, infos), rewards, dones, infos
+            actions = np.full(self.num_envs, PASS, dtype=np.int64)
+            actions[pending] = self._opponent_actions(obs, pending)
+            self.venv.step_async(actions)
+            obs, step_rewards, step_dones, step_infos = self.venv.step_wait()
+            self.plies += len(pending)
+            for i in pending:
+                if not step_dones[i]:
+                    self.turns[i] = not self.turns[i]
+                    continue
+                reward = step_rewards[i] * (1 if self.colors[i] else -1)
+                if not dones[i]:
+                    rewards[i] += reward
+                    dones[i] = True
+                    infos[i] = step_infos[i]
+                self._end_game(i, reward)
+
+    def _with_masks(self, obs, infos):
+        masks = np.packbits(self.venv.action_masks(), axis=1, bitorder="little")
+        for info in infos:
+            if "terminal_observation" in info and len(info["terminal_observation"]) != OBS_SIZE:
+                # No moves follow a final position
+                info["terminal_observation"] = np.concatenate(
+                    [info["terminal_observation"], np.zeros(MASK_BYTES, dtype=np.uint8)])
+        return np.concatenate([obs, masks], axis=1)
+
+    def _opponent_actions(self, obs, pending):
+        masks = self.venv.action_masks()
+        actions = np.empty(len(pending), dtype=np.int64)
+        groups = {}
+        for j, i in enumerate(pending):
+            groups.setdefault(id(self.playing[i]), []).append(j)
+        for js in groups.values():
+            js = np.array(js)
+            rows = pending[js]
+            opponent = self.playing[rows[0]]
+            if opponent is None:
+                actions[js] = [self.rng.choice(np.flatnonzero(masks[i])) for i in rows]
+                continue
+            planes = np.empty((len(rows),) + obs_encoding.OBS_SHAPE, dtype=np.float32)
+            logits = opponent.logits(obs_encoding.unpack_board(obs[rows], planes))
+            logits = np.where(masks[rows], logits, -np.inf)
+            if self.temperature > 0:
+                # Gumbel-max: a sample from the masked softmax
+                logits = logits / self.temperature + self.rng.gumbel(size=logits.shape)
+            actions[js] = np.argmax(logits, axis=1)
+        return actions
+
+
+class IterationTimer(BaseCallback):
+    def _on_rollout_start(self):
+        self.rollout_start = time.perf_counter()
+
+    def _on_rollout_end(self):
+        self.rollout_end = time.perf_counter()
+
+    def _on_step(self):
+        return True
+
+
+def write_json(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def save_snapshot(model, out_dir, state):
+    path = os.path.join("snapshots", f"step_{model.num_timesteps:010d}")
+    np.savez(os.path.join(out_dir, path + ".npz"), **policy_arrays(model.policy))
+    state["snapshots"].append({"path": path, "timesteps": model.num_timesteps})
+
+
+def opponent_pool(out_dir, state, pool_size):
+    # The random mover plus the most recent snapshots
+    recent = state["snapshots"][-pool_size:] if pool_size else []
+    return [None] + [NumpyPolicy.load(os.path.join(out_dir, s["path"] + ".npz")) for s in recent]
+
+
+def checkpoint(model, out_dir, state):
+    atomic_save(model, os.path.join(out_dir, LATEST))
+    state["timesteps"] = model.num_timesteps
+    write_json(os.path.join(out_dir, STATE_FILE), state)
+
+
+def train(args):
+    torch.set_num_threads(args.threads)
+    out_dir = args.out
+    os.makedirs(os.path.join(out_dir, "snapshots"), exist_ok=True)
+    state_path = os.path.join(out_dir, STATE_FILE)
+    resume = not args.fresh and os.path.exists(os.path.join(out_dir, LATEST))
+    if resume:
+        with open(state_path) as f:
+            state = json.load(f)
+    else:
+        state = {"timesteps": 0, "iterations": 0, "snapshots": []}
+
+    venv = BatchedChessEnv(args.envs, n_workers=args.workers, obs_mode="packed")
+    env = SelfPlayVecEnv(venv, opponent_pool(out_dir, state, args.pool_size), args.seed, args.temperature)
+    policy_kwargs = {
+        "features_extractor_class": PackedBoardExtractor,
+        "features_extractor_kwargs": {"include_state": False},
+        "net_arch": args.net_arch,
+        "activation_fn": ACTIVATIONS[args.activation],
+    }
+    if resume:
+        model = PPO.load(os.path.join(out_dir, LATEST), env=env, device="cpu",
+                         custom_objects={"policy_class": SelfPlayPolicy})
+        print(f"Resumed {out_dir} at {model.num_timesteps} steps, {len(state['snapshots'])} snapshots")
+    else:
+        model = PPO(SelfPlayPolicy, env, n_steps=args.n_steps, batch_size=args.batch_size, n_epochs=args.epochs,
+                    learning_rate=args.lr, ent_coef=args.ent_coef, policy_kwargs=policy_kwargs,
+                    seed=args.seed, device="cpu")
+    model.set_logger(configure(None, []))
+    timer = IterationTimer()
+
+    try:
+        while model.num_timesteps < args.timesteps:
+            plies = env.plies
+            start = time.perf_counter()
+            model.learn(model.n_steps * args.envs, callback=timer, reset_num_timesteps=False)
+            done = time.perf_counter()
+            state["iterations"] += 1
+            rollout = timer.rollout_end - timer.rollout_start
+            score = f"{np.mean(env.scores):.3f}" if env.scores else "n/a"
+            print(f"iter {state['iterations']:>5}  steps {model.num_timesteps:>10}  "
+                  f"env-steps/s {(env.plies - plies) / rollout:8.0f}  rollout {rollout:6.2f}s  "
+                  f"update {done - timer.rollout_end:6.2f}s  total {done - start:6.2f}s  "
+                  f"score vs pool {score}", flush=True)
+            if state["iterations"] % args.snapshot_every == 0:
+                save_snapshot(model, out_dir, state)
+                env.set_opponents(opponent_pool(out_dir, state, args.pool_size))
+            if state["iterations"] % args.checkpoint_every == 0:
+                checkpoint(model, out_dir, state)
+    except KeyboardInterrupt:
+        checkpoint(model, out_dir, state)
+        print(f"\nInterrupted; checkpoint saved at {model.num_timesteps} steps")
+        raise SystemExit(1)
+    finally:
+        env.close()
+
+    if not state["snapshots"] or state["snapshots"][-1]["timesteps"] != model.num_timesteps:
+        save_snapshot(model, out_dir, state)
+    checkpoint(model, out_dir, state)
+    return state
+
+
+def ladder_by_steps(snapshots):
+    # Evenly spaced through training, ending with the latest snapshot
+    n = len(snapshots)
+    return [snapshots[round(q * (n - 1))] for q in np.linspace(0, 1, len(LEVELS))]
+
+
+def ladder_by_elo(out_dir, snapshots, games, candidates, workers, seed):
+    # Rates a spread of snapshots against each other and the random mover,
+    # then picks the ones closest to evenly spaced ratings
+    picked = ladder_by_steps(snapshots) if candidates <= len(LEVELS) else [
+        snapshots[round(q * (len(snapshots) - 1))] for q in np.linspace(0, 1, candidates)]
+    picked = list({s["path"]: s for s in picked}.values())
+    specs = [arena.RANDOM] + [os.path.join(out_dir, s["path"]) for s in picked]
+    names = [arena.player_name(spec) for spec in specs]
+    records = []
+    for chunk in arena.play_games(specs, arena.schedule(specs, games, seed), workers):
+        records.extend(chunk)
+    ratings = arena.ratings(records, names)
+    rated = sorted(picked, key=lambda s: ratings[os.path.basename(s["path"])][0])
+    elos = [ratings[os.path.basename(s["path"])][0] for s in rated]
+    for s, elo in zip(rated, elos):
+        s["elo"] = round(float(elo), 1)
+    ladder = []
+    for target in np.linspace(elos[0], elos[-1], len(LEVELS)):
+        ladder.append(rated[int(np.argmin([abs(elo - target) for elo in elos]))])
+    return ladder
+
+
+def _hidden_sizes(arrays, prefix):
+    sizes = []
+    while f"{prefix}_{len(sizes)}_bias" in arrays:
+        sizes.append(arrays[f"{prefix}_{len(sizes)}_bias"].shape[0])
+    return sizes
+
+
+def export_ladder(out_dir, ladder, export_dir):
+    os.makedirs(export_dir, exist_ok=True)
+    for level, snapshot in zip(LEVELS, ladder):
+        src = os.path.join(out_dir, snapshot["path"] + ".npz")
+        dst = os.path.join(export_dir, f"ppo_{level}")
+        with np.load(src) as data:
+            arrays = {k: data[k] for k in data.files}
+        # An SB3 checkpoint on the GUI's float32 observations, for Pro's
+        # online learner; the .npz is what the other levels load
+        net_arch = {"pi": _hidden_sizes(arrays, "pi"), "vf": _hidden_sizes(arrays, "vf")}
+        model = PPO("MlpPolicy", ChessEnv(), device="cpu", policy_kwargs={
+            "net_arch": net_arch, "activation_fn": ACTIVATIONS[str(arrays["activation"])]})
+        load_policy_arrays(model.policy, arrays)
+        atomic_save(model, dst)
+        shutil.copyfile(src, dst + ".npz")
+        elo = f", Elo {snapshot['elo']:+.0f}" if "elo" in snapshot else ""
+        print(f"  {level:<7} <- {snapshot['path']} ({snapshot['timesteps']} steps{elo})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the difficulty checkpoints by self-play on CPU")
+    parser.add_argument("--out", default="runs/selfplay", help="run directory (checkpoints, snapshots, state)")
+    parser.add_argument("--timesteps", type=int, default=5_000_000, help="learner moves to train for")
+    parser.add_argument("--envs", type=int, default=128, help="boards played in parallel")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="env subprocesses (0: in-process)")
+    parser.add_argument("--threads", type=int, default=os.cpu_count(), help="torch threads for the update")
+    parser.add_argument("--n-steps", type=int, default=128, help="rollout length per board")
+    parser.add_argument("--batch-size", type=int, default=2048)
+    parser.add_argument("--epochs", type=int, default=4)
+    parser.add_argument("--lr", type=float, default=3e-4)
+    parser.add_argument("--ent-coef", type=float, default=0.01)
+    parser.add_argument("--net-arch", type=int, nargs="+", default=[256, 256])
+    parser.add_argument("--activation", choices=list(ACTIVATIONS), default="tanh")
+    parser.add_argument("--snapshot-every", type=int, default=10, help="iterations between frozen snapshots")
+    parser.add_argument("--checkpoint-every", type=int, default=5, help="iterations between resumable checkpoints")
+    parser.add_argument("--pool-size", type=int, default=8, help="recent snapshots the learner plays against")
+    parser.add_argument("--temperature", type=float, default=1.0, help="opponent sampling temperature (0: greedy)")
+    parser.add_argument("--fresh", action="store_true", help="ignore an existing checkpoint in --out")
+    parser.add_argument("--export-only", action="store_true", help="skip training; export from --out")
+    parser.add_argument("--ladder", choices=["steps", "elo"], default="steps",
+                        help="pick the levels by training steps or by arena Elo")
+    parser.add_argument("--arena-games", type=int, default=40, help="games per pair for --ladder elo")
+    parser.add_argument("--arena-candidates", type=int, default=8, help="snapshots rated for --ladder elo")
+    parser.add_argument("--export-dir", default="chess_agent")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.export_only:
+        with open(os.path.join(args.out, STATE_FILE)) as f:
+            state = json.load(f)
+    else:
+        state = train(args)
+    snapshots = state["snapshots"]
+    if not snapshots:
+        parser.error(f"{args.out} has no snapshots to export")
+    if args.ladder == "elo":
+        ladder = ladder_by_elo(args.out, snapshots, args.arena_games, args.arena_candidates, args.workers, args.seed)
+    else:
+        ladder = ladder_by_steps(snapshots)
+    print(f"Exporting the ladder to {args.export_dir}/")
+    export_ladder(args.out, ladder, args.export_dir)